@@ -0,0 +1,93 @@
+"""Per-page OCR time of each available engine.
+
+    python benchmarks/ocr_engines.py [document.pdf] [--pages 10] [--language eng+pol]
+
+Pages are rendered the way the OCR workers render them (300 dpi, grayscale,
+in memory); without a PDF a synthetic text page is used. Every page is then
+recognized by the tesseract CLI engine (a new process per page, as with
+pytesseract) and, when `tesserocr` is installed, by the persistent engine,
+whose one-off initialization is reported separately. Both are configured
+like the OCR workers' (OCR_TESSDATA_PATH).
+"""
+
+import argparse
+import statistics
+import time
+
+from PIL import Image, ImageDraw
+
+from sheaf.config import settings
+from sheaf.services.ocr_cache import OCR_DPI
+from sheaf.services.ocr_engine import OCREngine, TesseractCLIEngine, TesserocrEngine
+
+
+def synthetic_page() -> Image.Image:
+    image = Image.new("L", (2480, 3508), color=255)  # A4 at 300 dpi
+    draw = ImageDraw.Draw(image)
+    line = "The quick brown fox jumps over the lazy dog. Zażółć gęślą jaźń 0123456789"
+    for row in range(60):
+        draw.text((150, 150 + row * 52), line, fill=0, font_size=36)
+    return image
+
+
+def render_pages(pdf_path: str, count: int) -> list[Image.Image]:
+    from pdf2image import convert_from_path
+
+    return convert_from_path(pdf_path, dpi=OCR_DPI, first_page=1, last_page=count, grayscale=True)
+
+
+def run(engine: OCREngine, pages: list[Image.Image], language: str) -> list[float]:
+    timings = []
+    for page in pages:
+        started = time.perf_counter()
+        engine.recognize(page, language)
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def report(name: str, timings: list[float]) -> None:
+    print(
+        f"{name:<12} pages={len(timings):<4} "
+        f"mean={statistics.mean(timings) * 1000:8.1f} ms  "
+        f"median={statistics.median(timings) * 1000:8.1f} ms  "
+        f"min={min(timings) * 1000:8.1f} ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("pdf", nargs="?")
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--language", default="eng")
+    args = parser.parse_args()
+
+    if args.pdf:
+        pages = render_pages(args.pdf, args.pages)
+    else:
+        page = synthetic_page()
+        pages = [page] * args.pages
+
+    report("tesseract", run(TesseractCLIEngine(), pages, args.language))
+
+    try:
+        started = time.perf_counter()
+        engine = TesserocrEngine(settings.ocr_tessdata_path)
+    except ImportError:
+        print("tesserocr    not installed (pip install 'sheaf[tesserocr]')")
+        return
+    try:
+        engine.recognize(pages[0], args.language)  # loads the language models
+    except RuntimeError as exc:
+        # tesserocr raises this when Tesseract can't initialize (e.g. no tessdata).
+        engine.close()
+        print(f"tesserocr    engine unavailable: {exc}")
+        return
+    print(f"tesserocr    init + first page {(time.perf_counter() - started) * 1000:.1f} ms")
+    try:
+        report("tesserocr", run(engine, pages, args.language))
+    finally:
+        engine.close()
+
+
+if __name__ == "__main__":
+    main()
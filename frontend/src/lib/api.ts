@@ -144,18 +144,37 @@ export interface OCRText {
   text_length: number;
 }
 
+export interface OCREvent {
+  doc_id: string;
+  ocr_status: string;
+  ocr_error?: string | null;
+  pages_done: number;
+  pages_total?: number | null;
+}
+
 export const ocrApi = {
   start: (docId: string) => api.post<{ doc_id: string; message: string; ocr_status: string }>(`/ocr/${docId}/start`),
   status: (docId: string) => api.get<OCRStatus>(`/ocr/${docId}/status`),
   text: (docId: string) => api.get<OCRText>(`/ocr/${docId}/text`),
+  // EventSource can't send headers, so the token goes in the query string.
+  events: (docId: string) =>
+    new EventSource(
+      `/api/ocr/${docId}/events?token=${encodeURIComponent(localStorage.getItem('token') ?? '')}`,
+    ),
 };
 
 // Search types and API
+export interface SearchPageHit {
+  page_no: number;
+  snippet: string; // HTML: escaped text with <mark> highlights
+}
+
 export interface SearchResultItem {
   id: string;
   original_name: string;
   snippet: string;
   rank: number;
+  pages: SearchPageHit[];
 }
 
 export interface SearchResponse {
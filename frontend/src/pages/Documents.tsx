@@ -1,16 +1,19 @@
 import { useEffect, useState } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { Download, Trash2, Globe, Lock, Copy, Check, BookOpen, ScanText, Loader2, FileSearch, WifiOff } from 'lucide-react';
-import { docsApi, ocrApi, type Document } from '../lib/api';
+import { docsApi, ocrApi, type Document, type OCREvent } from '../lib/api';
 import { useOfflineContext } from '../context/OfflineContext';
 import SaveOfflineButton from '../components/SaveOfflineButton';
 
+const OCR_DONE = ['completed', 'failed', 'cancelled'];
+
 export default function Documents() {
   const navigate = useNavigate();
   const [docs, setDocs] = useState<Document[]>([]);
   const [total, setTotal] = useState(0);
   const [copied, setCopied] = useState<string | null>(null);
   const [ocrLoading, setOcrLoading] = useState<string | null>(null);
+  const [ocrWatching, setOcrWatching] = useState<string | null>(null);
   const { isOnline, offlineDocuments, isDocumentOffline } = useOfflineContext();
 
   const load = () => {
@@ -32,21 +35,62 @@ export default function Documents() {
 
   useEffect(load, [isOnline, offlineDocuments]);
 
+  // Follow the OCR run started from this page until it ends. The stream is
+  // closed when the run ends, another one is followed or the page unmounts,
+  // which also ends the server's subscription.
+  useEffect(() => {
+    if (!ocrWatching) return;
+    const docId = ocrWatching;
+    let stopped = false;
+    let timer: ReturnType<typeof setTimeout> | undefined;
+    const finish = () => {
+      setOcrWatching(null);
+      setOcrLoading(null);
+      load();
+    };
+    // Poll only when the event stream isn't available.
+    const pollStatus = async () => {
+      const { data } = await ocrApi.status(docId);
+      if (stopped) return;
+      if (OCR_DONE.includes(data.ocr_status)) {
+        finish();
+      } else {
+        timer = setTimeout(pollStatus, 2000);
+      }
+    };
+    if (typeof EventSource === 'undefined') {
+      pollStatus();
+      return () => {
+        stopped = true;
+        clearTimeout(timer);
+      };
+    }
+    const events = ocrApi.events(docId);
+    events.onmessage = (message) => {
+      const event: OCREvent = JSON.parse(message.data);
+      if (OCR_DONE.includes(event.ocr_status)) {
+        events.close();
+        finish();
+      }
+    };
+    events.onerror = () => {
+      // The browser retries on its own unless the stream was refused.
+      if (events.readyState === EventSource.CLOSED && !stopped) {
+        pollStatus();
+      }
+    };
+    return () => {
+      stopped = true;
+      clearTimeout(timer);
+      events.close();
+    };
+  }, [ocrWatching]);
+
   const handleStartOcr = async (docId: string) => {
     setOcrLoading(docId);
     try {
       await ocrApi.start(docId);
-      // Poll for status updates
-      const pollStatus = async () => {
-        const { data } = await ocrApi.status(docId);
-        if (data.ocr_status === 'completed' || data.ocr_status === 'failed') {
-          load();
-          setOcrLoading(null);
-        } else {
-          setTimeout(pollStatus, 2000);
-        }
-      };
-      pollStatus();
+      setOcrWatching(docId);
     } catch {
       setOcrLoading(null);
       alert('Failed to start OCR');
@@ -1,5 +1,5 @@
 import { useCallback, useEffect, useRef, useState } from 'react';
-import { useNavigate, useParams } from 'react-router-dom';
+import { useNavigate, useParams, useSearchParams } from 'react-router-dom';
 import {
   ArrowLeft,
   ChevronLeft,
@@ -22,6 +22,8 @@ pdfjsLib.GlobalWorkerOptions.workerSrc = pdfjsWorker;
 
 export default function ReaderPage() {
   const { docId } = useParams<{ docId: string }>();
+  const [searchParams] = useSearchParams();
+  const requestedPage = Number(searchParams.get('page')) || 0;
   const navigate = useNavigate();
   const { isOnline, isDocumentOffline, getOfflinePdf, saveProgressOffline } = useOfflineContext();
 
@@ -155,6 +157,11 @@ export default function ReaderPage() {
           }
         }
 
+        // A search hit opens the matching page instead of the saved position.
+        if (requestedPage > 0) {
+          startPage = Math.min(requestedPage, pdfDoc.numPages);
+        }
+
         setPage(startPage);
 
         if (isOnline) {
@@ -174,7 +181,7 @@ export default function ReaderPage() {
     return () => {
       cancelled = true;
     };
-  }, [docId, navigate, isOnline, isDocumentOffline, getOfflinePdf]);
+  }, [docId, requestedPage, navigate, isOnline, isDocumentOffline, getOfflinePdf]);
 
   // Render current page to canvas
   useEffect(() => {
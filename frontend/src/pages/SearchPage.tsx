@@ -72,7 +72,13 @@ export default function SearchPage() {
           {results.map((result) => (
             <div
               key={result.id}
-              onClick={() => navigate(`/read/${result.id}`)}
+              onClick={() =>
+                navigate(
+                  result.pages.length
+                    ? `/read/${result.id}?page=${result.pages[0].page_no}`
+                    : `/read/${result.id}`,
+                )
+              }
               className="bg-(--color-bg-card) border border-(--color-border) rounded-xl p-4 cursor-pointer hover:border-(--color-primary) transition-colors"
             >
               <div className="flex items-start gap-3">
@@ -85,6 +91,23 @@ export default function SearchPage() {
                     className="text-xs text-(--color-text-muted) mt-1 line-clamp-2"
                     dangerouslySetInnerHTML={{ __html: result.snippet }}
                   />
+                  {result.pages.length > 0 && (
+                    <div className="flex flex-wrap gap-1.5 mt-2">
+                      {result.pages.map((hit) => (
+                        <button
+                          key={hit.page_no}
+                          type="button"
+                          onClick={(e) => {
+                            e.stopPropagation();
+                            navigate(`/read/${result.id}?page=${hit.page_no}`);
+                          }}
+                          className="text-xs px-2 py-0.5 rounded-md bg-(--color-primary-light) text-(--color-primary) hover:opacity-80"
+                        >
+                          p. {hit.page_no}
+                        </button>
+                      ))}
+                    </div>
+                  )}
                 </div>
               </div>
             </div>
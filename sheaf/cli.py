@@ -0,0 +1,164 @@
+"""Maintenance commands: `python -m sheaf.cli <command>` (or the `sheaf` script)."""
+
+import argparse
+import asyncio
+
+from fastapi import HTTPException
+from sqlalchemy import select
+
+from sheaf.database import async_session, init_db
+from sheaf.dependencies import get_document_storage
+from sheaf.models.document import Document
+from sheaf.models.ocr_backfill import OCRBackfill
+from sheaf.services.blobs import dedupe_document
+from sheaf.services.linearize import linearize_document, pending_document_ids
+from sheaf.services.ocr import split_legacy_pages
+from sheaf.services.ocr_backfill import backfill_progress, create_backfill
+from sheaf.services.ocr_cache import prune_results
+
+
+async def dedupe(batch_size: int = 100) -> None:
+    """Hash pre-dedup documents and merge identical files into shared blobs."""
+    await init_db()
+    scanned = removed = 0
+    last_id = ""
+    while True:
+        async with async_session() as db:
+            result = await db.execute(
+                select(Document)
+                .where(Document.blob_id.is_(None), Document.id > last_id)
+                .order_by(Document.id)
+                .limit(batch_size)
+            )
+            docs = list(result.scalars().all())
+            if not docs:
+                break
+            for doc in docs:
+                last_id = doc.id
+                try:
+                    storage = await get_document_storage(doc, db)
+                except HTTPException as exc:
+                    print(f"skip {doc.id}: {exc.detail}")
+                    continue
+                if await dedupe_document(db, doc, storage):
+                    removed += 1
+                scanned += 1
+    print(f"dedupe: {scanned} documents processed, {removed} duplicate files removed")
+
+
+async def linearize(retry_failed: bool = False) -> None:
+    """Produce linearized variants for every document that lacks one."""
+    await init_db()
+    async with async_session() as db:
+        doc_ids = await pending_document_ids(db, include_failed=retry_failed)
+    done = failed = 0
+    for doc_id in doc_ids:
+        async with async_session() as db:
+            doc = await db.get(Document, doc_id)
+            try:
+                if doc.blob_id is None:
+                    await dedupe_document(db, doc, await get_document_storage(doc, db))
+                await linearize_document(doc_id, db)
+                done += 1
+            except Exception as exc:
+                print(f"failed {doc_id}: {exc}")
+                failed += 1
+    print(f"linearize: {done} documents linearized, {failed} failed")
+
+
+async def prune_ocr_cache() -> None:
+    """Delete cached OCR results past their retention period."""
+    await init_db()
+    async with async_session() as db:
+        removed = await prune_results(db)
+    print(f"prune-ocr-cache: {removed} cached results removed")
+
+
+async def split_pages(batch_size: int = 100) -> None:
+    """Store per-page text for documents extracted before pages were kept."""
+    await init_db()
+    async with async_session() as db:
+        split = await split_legacy_pages(db, batch_size)
+    print(f"split-pages: {split} documents split into pages")
+
+
+async def ocr_backfill(args: argparse.Namespace) -> None:
+    """Queue OCR for all matching documents as one throttled backfill."""
+    await init_db()
+    filters = {
+        "owner_id": args.owner,
+        "ocr_status": args.status or ["none"],
+        "min_size_bytes": args.min_size,
+        "max_size_bytes": args.max_size,
+    }
+    async with async_session() as db:
+        backfill = await create_backfill(
+            db,
+            "cli",
+            filters,
+            mode=args.mode,
+            max_per_hour=args.max_per_hour,
+            window=args.window,
+        )
+    print(f"ocr-backfill: {backfill.id} queued {backfill.total_jobs} documents")
+
+
+async def ocr_backfill_status(backfill_id: str | None = None) -> None:
+    """Print job counts for one backfill, or for every backfill."""
+    await init_db()
+    async with async_session() as db:
+        query = select(OCRBackfill).order_by(OCRBackfill.created_at)
+        if backfill_id:
+            query = query.where(OCRBackfill.id == backfill_id)
+        for backfill in (await db.execute(query)).scalars().all():
+            progress = await backfill_progress(db, backfill.id)
+            counts = " ".join(f"{status}={n}" for status, n in progress.items())
+            print(f"{backfill.id} {backfill.status} total={backfill.total_jobs} {counts}")
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="sheaf")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("dedupe", help="hash existing documents and share identical files")
+    p.add_argument("--batch-size", type=int, default=100)
+
+    p = commands.add_parser("linearize", help="create fast-web-view variants for all documents")
+    p.add_argument("--retry-failed", action="store_true")
+
+    commands.add_parser("prune-ocr-cache", help="drop OCR results unused past the retention period")
+
+    p = commands.add_parser("split-pages", help="store per-page text of older OCR'd documents")
+    p.add_argument("--batch-size", type=int, default=100)
+
+    p = commands.add_parser("ocr-backfill", help="queue OCR for existing documents, throttled")
+    p.add_argument("--owner", help="only documents of this user id")
+    p.add_argument(
+        "--status", action="append", help="OCR status to include (repeatable, default none)"
+    )
+    p.add_argument("--min-size", type=int)
+    p.add_argument("--max-size", type=int)
+    p.add_argument("--mode", choices=["auto", "text-only", "ocr-only"], default="auto")
+    p.add_argument("--max-per-hour", type=int, help="jobs started per hour, 0 = unlimited")
+    p.add_argument("--window", help='allowed hours, e.g. "22:00-06:00"')
+
+    p = commands.add_parser("ocr-backfill-status", help="show backfill progress")
+    p.add_argument("backfill_id", nargs="?")
+
+    args = parser.parse_args(argv)
+    if args.command == "dedupe":
+        asyncio.run(dedupe(args.batch_size))
+    elif args.command == "linearize":
+        asyncio.run(linearize(args.retry_failed))
+    elif args.command == "prune-ocr-cache":
+        asyncio.run(prune_ocr_cache())
+    elif args.command == "split-pages":
+        asyncio.run(split_pages(args.batch_size))
+    elif args.command == "ocr-backfill":
+        asyncio.run(ocr_backfill(args))
+    elif args.command == "ocr-backfill-status":
+        asyncio.run(ocr_backfill_status(args.backfill_id))
+
+
+if __name__ == "__main__":
+    main()
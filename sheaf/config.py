@@ -17,6 +17,21 @@ class Settings(BaseSettings):
     # Storage
     storage_backend: str = "local"  # "local" | "azure"
     local_storage_path: str = "./storage"
+    max_upload_bytes: int = 1024 * 1024 * 1024
+
+    # Linearization ("fast web view") via qpdf
+    linearize_enabled: bool = False
+    qpdf_path: str = "qpdf"
+    linearize_timeout: int = 600
+
+    # Page rendering (thumbnails and page images)
+    render_cache_path: str = "./cache/pages"
+    render_cache_max_bytes: int = 1024 * 1024 * 1024
+    render_source_cache_path: str = "./cache/render-sources"  # remote PDFs being rendered
+    render_source_cache_max_bytes: int = 2 * 1024 * 1024 * 1024
+    render_workers: int = 2
+    render_timeout: int = 60
+    thumbnail_width: int = 240
 
     # Azure Blob Storage
     azure_storage_connection_string: str = ""
@@ -25,6 +40,14 @@ class Settings(BaseSettings):
     # Redis
     redis_url: str = "redis://localhost:6379/0"
     cache_ttl_seconds: int = 3600
+    cache_max_object_bytes: int = 512 * 1024 * 1024  # larger PDFs bypass the cache
+    cache_chunk_bytes: int = 1024 * 1024
+    cache_fill_lock_seconds: float = 5.0  # max wait for another worker's chunk fill
+    cache_memory_bytes: int = 256 * 1024 * 1024  # in-process LRU budget per worker
+    cache_admit_after_hits: int = 2  # misses before a PDF is admitted to the cache
+
+    # Download counters (write-behind)
+    download_flush_interval_seconds: float = 10.0
 
     # Auth
     access_token_expire_minutes: int = 60
@@ -34,7 +57,41 @@ class Settings(BaseSettings):
     # OCR
     ocr_enabled: bool = True
     ocr_language: str = "eng+pol"
+    # Job deadline once it has a slot: OCR_TIMEOUT + OCR_TIMEOUT_PER_PAGE per page to extract;
+    # both 0 = no deadline.
     ocr_timeout: int = 300
+    ocr_timeout_per_page: int = 30
+    ocr_page_timeout: int = 120  # per page, for rendering and for recognition
+    # pdftotext gets OCR_PAGE_TIMEOUT + this per page for the whole document.
+    ocr_text_layer_timeout_per_page: float = 1.0
+    ocr_cancel_poll_seconds: float = 2.0
+    ocr_events_keepalive_seconds: float = 15.0
+    ocr_engine: str = "auto"  # auto | tesserocr | cli
+    ocr_tessdata_path: str = ""  # tessdata directory for tesserocr, "" = library default
+    ocr_workers: int = 0  # OCR processes; 0 = one per CPU core
+    ocr_inflight_pages: int = 0  # pages queued per document; 0 = OCR_WORKERS
+    ocr_progress_interval_seconds: float = 2.0
+    ocr_min_text_chars: int = 20  # shorter text layers are OCR'd in "auto" mode
+    ocr_backfill_max_per_hour: int = 120  # jobs a backfill may start per hour, 0 = unlimited
+    ocr_backfill_window: str = ""  # e.g. "22:00-06:00" (server local time), "" = any time
+    ocr_backfill_priority: int = -5
+    ocr_cache_retention_days: int = 90  # drop cached results unused for this long
+    ocr_page_cache_enabled: bool = True
+    ocr_page_cache_path: str = "./cache/ocr-pages"
+    ocr_page_cache_max_bytes: int = 256 * 1024 * 1024
+    ocr_max_concurrent_jobs: int = 2
+    ocr_queue_workers: int = 2  # job runners per instance; 0 = don't run jobs here
+    ocr_lease_seconds: int = 60
+    ocr_poll_interval_seconds: float = 2.0
+    ocr_max_attempts: int = 3
+    ocr_retry_base_seconds: int = 30
+    ocr_retry_max_seconds: int = 1800
+
+    # Search
+    search_pages_per_hit: int = 3  # matching pages listed per result
+    search_snippet_window_chars: int = 2000  # text highlighted for documents without pages
+    search_cache_ttl_seconds: int = 600
+    search_cache_max_hits: int = 1000  # ranked hits cached per query; deeper pages run uncached
 
     # Calibre
     calibre_enabled: bool = True
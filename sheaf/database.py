@@ -1,4 +1,4 @@
-from sqlalchemy import text
+from sqlalchemy import event, text
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase
 
@@ -40,11 +40,16 @@ async def _migrate_columns(conn) -> None:
         ("users", "storage_backend", "VARCHAR(20) DEFAULT 'local'"),
         ("users", "azure_connection_string", "VARCHAR(500)"),
         ("users", "azure_container_name", "VARCHAR(200)"),
+        ("documents", "content_hash", "VARCHAR(64)"),
+        ("documents", "blob_id", "VARCHAR(36)"),
+        ("documents", "linearize_status", "VARCHAR(20) DEFAULT 'none'"),
         # OCR fields
         ("documents", "extracted_text", "TEXT"),
         ("documents", "ocr_status", "VARCHAR(20) DEFAULT 'none'"),
         ("documents", "ocr_error", "VARCHAR(500)"),
         ("documents", "text_extracted_at", "TIMESTAMP"),
+        ("documents", "ocr_pages_done", "INTEGER DEFAULT 0"),
+        ("documents", "ocr_pages_total", "INTEGER"),
         # Calibre fields
         ("documents", "calibre_id", "VARCHAR(100)"),
         ("documents", "calibre_metadata", "JSON"),
@@ -54,20 +59,134 @@ async def _migrate_columns(conn) -> None:
             await conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {col_type}"))
 
 
-async def _create_fts_index(conn) -> None:
-    """Create PostgreSQL full-text search index on documents.extracted_text."""
+async def _create_search_vector(conn) -> None:
+    """Add stored `search_vector` tsvectors and GIN indexes to documents and pages (PostgreSQL).
+
+    The columns are generated from the extracted text, so PostgreSQL keeps
+    them in sync whenever OCR writes it; searches match and rank against
+    them instead of re-tokenizing every document.
+    """
     if "postgresql" not in settings.database_url:
         return
     await conn.execute(
         text(
-            "CREATE INDEX IF NOT EXISTS idx_documents_fts "
-            "ON documents USING GIN (to_tsvector('english', COALESCE(extracted_text, '')))"
+            "ALTER TABLE documents ADD COLUMN IF NOT EXISTS search_vector tsvector "
+            "GENERATED ALWAYS AS (to_tsvector('english', COALESCE(extracted_text, ''))) STORED"
+        )
+    )
+    await conn.execute(
+        text(
+            "CREATE INDEX IF NOT EXISTS idx_documents_search_vector "
+            "ON documents USING GIN (search_vector)"
+        )
+    )
+    await conn.execute(
+        text(
+            "ALTER TABLE document_pages ADD COLUMN IF NOT EXISTS search_vector tsvector "
+            "GENERATED ALWAYS AS (to_tsvector('english', COALESCE(text, ''))) STORED"
         )
     )
+    await conn.execute(
+        text(
+            "CREATE INDEX IF NOT EXISTS idx_document_pages_search_vector "
+            "ON document_pages USING GIN (search_vector)"
+        )
+    )
+    # Superseded expression index, which the search query never matched.
+    await conn.execute(text("DROP INDEX IF EXISTS idx_documents_fts"))
+
+
+# SQLite full-text indexes over documents.extracted_text and
+# document_pages.text. Neither table has an INTEGER PRIMARY KEY, so their
+# rowids may change on VACUUM and cannot key an external-content FTS table;
+# a `<table>_fts_rows` table assigns each row a stable FTS rowid instead, and
+# the FTS table keeps its own copy of the text.
+_SQLITE_FTS_SOURCES = [
+    # (table, key column in <table>_fts_rows, text column)
+    ("documents", "doc_id", "extracted_text"),
+    ("document_pages", "page_id", "text"),
+]
+
+
+def _sqlite_fts_tables(table: str, key: str) -> list[str]:
+    return [
+        f"CREATE VIRTUAL TABLE {table}_fts USING fts5("
+        "body, tokenize = 'porter unicode61 remove_diacritics 2')",
+        f"CREATE TABLE {table}_fts_rows ("
+        f"rowid INTEGER PRIMARY KEY, {key} VARCHAR(36) NOT NULL UNIQUE)",
+    ]
+
+
+def _sqlite_fts_triggers(table: str, key: str, column: str) -> list[str]:
+    fts, rows = f"{table}_fts", f"{table}_fts_rows"
+    return [
+        f"""CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {table}
+        WHEN new.{column} IS NOT NULL
+        BEGIN
+            INSERT INTO {rows} ({key}) VALUES (new.id);
+            INSERT INTO {fts} (rowid, body)
+                SELECT rowid, new.{column} FROM {rows} WHERE {key} = new.id;
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE OF {column} ON {table}
+        BEGIN
+            DELETE FROM {fts} WHERE rowid = (SELECT rowid FROM {rows} WHERE {key} = old.id);
+            INSERT OR IGNORE INTO {rows} ({key}) SELECT new.id WHERE new.{column} IS NOT NULL;
+            INSERT INTO {fts} (rowid, body)
+                SELECT rowid, new.{column} FROM {rows}
+                WHERE {key} = new.id AND new.{column} IS NOT NULL;
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {table}
+        BEGIN
+            DELETE FROM {fts} WHERE rowid = (SELECT rowid FROM {rows} WHERE {key} = old.id);
+            DELETE FROM {rows} WHERE {key} = old.id;
+        END""",
+    ]
+
+
+def _ensure_sqlite_fts(conn) -> None:
+    """Create the FTS5 indexes and their triggers, backfilling them for existing databases."""
+    tables = {
+        name
+        for (name,) in conn.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'table'")
+    }
+    for table, key, column in _SQLITE_FTS_SOURCES:
+        if table not in tables:
+            continue
+        fts, rows = f"{table}_fts", f"{table}_fts_rows"
+        if fts not in tables:
+            conn.exec_driver_sql(f"DROP TABLE IF EXISTS {rows}")
+            for statement in _sqlite_fts_tables(table, key):
+                conn.exec_driver_sql(statement)
+            conn.exec_driver_sql(
+                f"INSERT INTO {rows} ({key}) SELECT id FROM {table} WHERE {column} IS NOT NULL"
+            )
+            conn.exec_driver_sql(
+                f"INSERT INTO {fts} (rowid, body) "
+                f"SELECT m.rowid, t.{column} FROM {rows} m JOIN {table} t ON t.id = m.{key}"
+            )
+        # Triggers are dropped along with their table (e.g. by drop_all), so always re-check.
+        for statement in _sqlite_fts_triggers(table, key, column):
+            conn.exec_driver_sql(statement)
+
+
+@event.listens_for(Base.metadata, "after_create")
+def _create_sqlite_fts(target, connection, **kw) -> None:
+    if connection.dialect.name == "sqlite":
+        _ensure_sqlite_fts(connection)
+
+
+@event.listens_for(Base.metadata, "before_drop")
+def _drop_sqlite_fts(target, connection, **kw) -> None:
+    if connection.dialect.name == "sqlite":
+        for table, _, _ in _SQLITE_FTS_SOURCES:
+            for action in ("insert", "update", "delete"):
+                connection.exec_driver_sql(f"DROP TRIGGER IF EXISTS {table}_fts_{action}")
+            connection.exec_driver_sql(f"DROP TABLE IF EXISTS {table}_fts")
+            connection.exec_driver_sql(f"DROP TABLE IF EXISTS {table}_fts_rows")
 
 
 async def init_db() -> None:
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
         await _migrate_columns(conn)
-        await _create_fts_index(conn)
+        await _create_search_vector(conn)
@@ -1,12 +1,18 @@
+import asyncio
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 
 from sheaf.config import settings
 from sheaf.database import init_db
+from sheaf.middleware import MaxBodySizeMiddleware
 from sheaf.models.user import User
 from sheaf.services.auth import hash_password
 from sheaf.services.cache import close_redis
+from sheaf.services.counters import download_counter
+from sheaf.services.ocr import shutdown_ocr_pool
+from sheaf.services.ocr_events import ocr_events
+from sheaf.services.ocr_queue import OCRWorker, reclaim_stale_jobs
 from sheaf.database import async_session
 
 
@@ -14,10 +20,33 @@ from sheaf.database import async_session
 async def lifespan(app: FastAPI):
     await init_db()
     await _ensure_admin()
+    flusher = asyncio.create_task(
+        download_counter.run(async_session, settings.download_flush_interval_seconds)
+    )
+    ocr_workers = await _start_ocr_workers()
+    ocr_events.start()
     yield
+    await ocr_events.stop()
+    for task in ocr_workers:
+        task.cancel()
+    await asyncio.gather(*ocr_workers, return_exceptions=True)
+    flusher.cancel()
+    await download_counter.flush(async_session)
+    shutdown_ocr_pool()
     await close_redis()
 
 
+async def _start_ocr_workers() -> list[asyncio.Task]:
+    if not settings.ocr_enabled or settings.ocr_queue_workers <= 0:
+        return []
+    async with async_session() as db:
+        await reclaim_stale_jobs(db)
+    return [
+        asyncio.create_task(OCRWorker(async_session, name=f"w{i}").run())
+        for i in range(settings.ocr_queue_workers)
+    ]
+
+
 async def _ensure_admin() -> None:
     """Create default admin user if it doesn't exist."""
     from sqlalchemy import select
@@ -40,6 +69,8 @@ app = FastAPI(
     version="0.1.0",
     lifespan=lifespan,
 )
+# Multipart framing adds a little on top of the file itself.
+app.add_middleware(MaxBodySizeMiddleware, max_bytes=settings.max_upload_bytes + 1024 * 1024)
 
 from sheaf.routers import auth, documents, admin, public, reading_progress  # noqa: E402
 from sheaf.routers import settings as settings_router  # noqa: E402
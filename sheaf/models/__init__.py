@@ -1,5 +1,19 @@
 from sheaf.models.user import User
 from sheaf.models.document import Document
 from sheaf.models.reading_progress import ReadingProgress
+from sheaf.models.blob import Blob
+from sheaf.models.ocr_job import OCRJob
+from sheaf.models.document_page import DocumentPage
+from sheaf.models.ocr_result import OCRResult
+from sheaf.models.ocr_backfill import OCRBackfill
 
-__all__ = ["User", "Document", "ReadingProgress"]
+__all__ = [
+    "User",
+    "Document",
+    "ReadingProgress",
+    "Blob",
+    "OCRJob",
+    "DocumentPage",
+    "OCRResult",
+    "OCRBackfill",
+]
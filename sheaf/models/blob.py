@@ -0,0 +1,25 @@
+import uuid
+from datetime import datetime
+
+from sqlalchemy import String, Integer, DateTime, UniqueConstraint, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from sheaf.database import Base
+
+
+class Blob(Base):
+    """A content-addressed stored file shared by every document with the same bytes."""
+
+    __tablename__ = "blobs"
+    __table_args__ = (UniqueConstraint("namespace", "content_hash", name="uq_blob_namespace_hash"),)
+
+    id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    namespace: Mapped[str] = mapped_column(String(300))  # storage location, see StorageBackend
+    content_hash: Mapped[str] = mapped_column(String(64))  # SHA-256 hex
+    storage_path: Mapped[str] = mapped_column(String(500))
+    size_bytes: Mapped[int] = mapped_column(Integer)
+    ref_count: Mapped[int] = mapped_column(Integer, default=0)
+    # Linearized ("fast web view") variant; equals storage_path if already linearized
+    linearized_path: Mapped[str | None] = mapped_column(String(500), nullable=True)
+    linearized_size: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
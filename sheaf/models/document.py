@@ -17,6 +17,10 @@ class Document(Base):
     original_name: Mapped[str] = mapped_column(String(255))
     content_type: Mapped[str] = mapped_column(String(100), default="application/pdf")
     size_bytes: Mapped[int] = mapped_column(Integer)
+    content_hash: Mapped[str | None] = mapped_column(String(64), nullable=True)  # SHA-256 hex
+    blob_id: Mapped[str | None] = mapped_column(
+        String(36), ForeignKey("blobs.id"), nullable=True
+    )  # None for files stored before deduplication
     storage_backend: Mapped[str] = mapped_column(String(20))  # "local" | "azure"
     storage_path: Mapped[str] = mapped_column(String(500))
     is_public: Mapped[bool] = mapped_column(default=False)
@@ -28,6 +32,12 @@ class Document(Base):
     ocr_status: Mapped[str] = mapped_column(String(20), default="none")  # none/pending/processing/completed/failed
     ocr_error: Mapped[str | None] = mapped_column(String(500), nullable=True)
     text_extracted_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    ocr_pages_done: Mapped[int] = mapped_column(Integer, default=0)
+    ocr_pages_total: Mapped[int | None] = mapped_column(Integer, nullable=True)
+
+    # Linearization (variant stored on the blob)
+    # none/pending/processing/completed/failed
+    linearize_status: Mapped[str] = mapped_column(String(20), default="none")
 
     # Calibre fields
     calibre_id: Mapped[str | None] = mapped_column(String(100), nullable=True)
@@ -0,0 +1,27 @@
+import uuid
+from datetime import datetime
+
+from sqlalchemy import String, Integer, DateTime, ForeignKey, Text, UniqueConstraint, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from sheaf.database import Base
+
+
+class DocumentPage(Base):
+    """Extracted text of one page and how it was obtained."""
+
+    __tablename__ = "document_pages"
+    __table_args__ = (UniqueConstraint("document_id", "page_no", name="uq_document_page"),)
+
+    id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    document_id: Mapped[str] = mapped_column(
+        String(36), ForeignKey("documents.id", ondelete="CASCADE"), index=True
+    )
+    page_no: Mapped[int] = mapped_column(Integer)  # 1-based
+    # "text" (embedded layer) | "ocr" | "timeout" | "legacy" (split from extracted_text)
+    method: Mapped[str] = mapped_column(String(10))
+    text: Mapped[str] = mapped_column(Text, default="")
+    job_id: Mapped[str | None] = mapped_column(String(36), nullable=True)  # OCR job that wrote it
+    # Settings it was extracted with (ocr_cache.checkpoint_key); pages are reused on a match
+    run_key: Mapped[str | None] = mapped_column(String(32), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
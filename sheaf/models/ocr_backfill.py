@@ -0,0 +1,26 @@
+import uuid
+from datetime import datetime
+
+from sqlalchemy import String, Integer, DateTime, JSON, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from sheaf.database import Base
+
+
+class OCRBackfill(Base):
+    """A bulk OCR request; its jobs run throttled and only in its time window."""
+
+    __tablename__ = "ocr_backfills"
+
+    id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    created_by: Mapped[str] = mapped_column(String(36))
+    filters: Mapped[dict] = mapped_column(JSON)
+    mode: Mapped[str] = mapped_column(String(20), default="auto")
+    priority: Mapped[int] = mapped_column(Integer, default=-5)
+    max_per_hour: Mapped[int] = mapped_column(Integer)  # jobs started per hour, 0 = unlimited
+    window: Mapped[str] = mapped_column(
+        String(20), default=""
+    )  # "HH:MM-HH:MM" local time, "" = any
+    status: Mapped[str] = mapped_column(String(20), default="active")  # active/cancelled
+    total_jobs: Mapped[int] = mapped_column(Integer, default=0)
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
@@ -0,0 +1,38 @@
+import uuid
+from datetime import datetime
+
+from sqlalchemy import String, Integer, DateTime, ForeignKey, Index, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from sheaf.database import Base
+
+
+class OCRJob(Base):
+    """A queued OCR run, claimed by workers under a renewable lease."""
+
+    __tablename__ = "ocr_jobs"
+    __table_args__ = (Index("ix_ocr_jobs_claim", "status", "priority", "run_after"),)
+
+    id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    document_id: Mapped[str] = mapped_column(
+        String(36), ForeignKey("documents.id", ondelete="CASCADE"), index=True
+    )
+    user_id: Mapped[str] = mapped_column(String(36))
+    language: Mapped[str] = mapped_column(String(50))
+    mode: Mapped[str] = mapped_column(String(20), default="auto")  # auto/text-only/ocr-only
+    status: Mapped[str] = mapped_column(
+        String(20), default="queued"
+    )  # queued/processing/completed/failed/cancelled
+    priority: Mapped[int] = mapped_column(Integer, default=0)  # higher runs first
+    batch_id: Mapped[str | None] = mapped_column(
+        String(36), ForeignKey("ocr_backfills.id"), nullable=True, index=True
+    )  # set for jobs created by a bulk backfill
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    max_attempts: Mapped[int] = mapped_column(Integer, default=3)
+    run_after: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    worker_id: Mapped[str | None] = mapped_column(String(100), nullable=True)
+    lease_expires_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    started_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)  # last claim
+    last_error: Mapped[str | None] = mapped_column(String(500), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
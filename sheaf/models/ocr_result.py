@@ -0,0 +1,26 @@
+import uuid
+from datetime import datetime
+
+from sqlalchemy import String, Integer, DateTime, JSON, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from sheaf.database import Base
+
+
+class OCRResult(Base):
+    """Extracted pages of a PDF, shared by every document with the same bytes.
+
+    Keyed by content hash plus everything that changes the output
+    (language, mode, engine settings), see `sheaf.services.ocr_cache`.
+    """
+
+    __tablename__ = "ocr_results"
+
+    id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    cache_key: Mapped[str] = mapped_column(String(64), unique=True)
+    content_hash: Mapped[str] = mapped_column(String(64), index=True)
+    page_count: Mapped[int] = mapped_column(Integer)
+    pages: Mapped[list] = mapped_column(JSON)  # [[text, method], ...] in page order
+    hit_count: Mapped[int] = mapped_column(Integer, default=0)
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+    last_used_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, index=True)
@@ -5,8 +5,14 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sheaf.database import get_db
 from sheaf.dependencies import require_admin
 from sheaf.models.document import Document
+from sheaf.models.ocr_backfill import OCRBackfill
 from sheaf.models.user import User
+from sheaf.schemas.ocr import OCRBackfillCreate, OCRBackfillRead
 from sheaf.schemas.user import UserRead
+from sheaf.services.cache import document_cache
+from sheaf.services.counters import download_counter
+from sheaf.services.ocr_backfill import backfill_progress, cancel_backfill, create_backfill
+from sheaf.services.search_cache import search_cache
 
 router = APIRouter(prefix="/api/admin", tags=["admin"], dependencies=[Depends(require_admin)])
 
@@ -35,9 +41,76 @@ async def stats(db: AsyncSession = Depends(get_db)):
     doc_count = (await db.execute(select(func.count(Document.id)))).scalar() or 0
     total_size = (await db.execute(select(func.sum(Document.size_bytes)))).scalar() or 0
     total_downloads = (await db.execute(select(func.sum(Document.download_count)))).scalar() or 0
+    total_downloads += download_counter.pending_total()
     return {
         "users": user_count,
         "documents": doc_count,
         "total_size_bytes": total_size,
         "total_downloads": total_downloads,
+        "cache": document_cache.stats(),
+        "search_cache": search_cache.stats(),
     }
+
+
+async def _backfill_read(db: AsyncSession, backfill: OCRBackfill) -> OCRBackfillRead:
+    return OCRBackfillRead(
+        id=backfill.id,
+        filters=backfill.filters,
+        mode=backfill.mode,
+        priority=backfill.priority,
+        max_per_hour=backfill.max_per_hour,
+        window=backfill.window,
+        status=backfill.status,
+        total_jobs=backfill.total_jobs,
+        created_at=backfill.created_at,
+        progress=await backfill_progress(db, backfill.id),
+    )
+
+
+async def _get_backfill(db: AsyncSession, backfill_id: str) -> OCRBackfill:
+    backfill = await db.get(OCRBackfill, backfill_id)
+    if backfill is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Backfill not found")
+    return backfill
+
+
+@router.post("/ocr/backfills", response_model=OCRBackfillRead, status_code=status.HTTP_201_CREATED)
+async def start_backfill(
+    data: OCRBackfillCreate,
+    admin: User = Depends(require_admin),
+    db: AsyncSession = Depends(get_db),
+):
+    filters = data.model_dump(
+        include={"owner_id", "ocr_status", "min_size_bytes", "max_size_bytes"}
+    )
+    try:
+        backfill = await create_backfill(
+            db,
+            admin.id,
+            filters,
+            mode=data.mode,
+            max_per_hour=data.max_per_hour,
+            window=data.window,
+            priority=data.priority,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    return await _backfill_read(db, backfill)
+
+
+@router.get("/ocr/backfills", response_model=list[OCRBackfillRead])
+async def list_backfills(db: AsyncSession = Depends(get_db)):
+    result = await db.execute(select(OCRBackfill).order_by(OCRBackfill.created_at.desc()))
+    return [await _backfill_read(db, backfill) for backfill in result.scalars().all()]
+
+
+@router.get("/ocr/backfills/{backfill_id}", response_model=OCRBackfillRead)
+async def get_backfill(backfill_id: str, db: AsyncSession = Depends(get_db)):
+    return await _backfill_read(db, await _get_backfill(db, backfill_id))
+
+
+@router.post("/ocr/backfills/{backfill_id}/cancel", response_model=OCRBackfillRead)
+async def stop_backfill(backfill_id: str, db: AsyncSession = Depends(get_db)):
+    backfill = await _get_backfill(db, backfill_id)
+    await cancel_backfill(db, backfill)
+    return await _backfill_read(db, backfill)
@@ -1,16 +1,36 @@
 import uuid
-
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, status
-from fastapi.responses import Response
-from sqlalchemy import select, func
+from pathlib import Path
+
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    UploadFile,
+    status,
+)
+from fastapi.responses import FileResponse
+from sqlalchemy import delete, select, func
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from sheaf.config import settings
 from sheaf.database import get_db
 from sheaf.dependencies import get_current_user, get_user_storage, get_document_storage
 from sheaf.models.document import Document
+from sheaf.models.document_page import DocumentPage
+from sheaf.models.ocr_job import OCRJob
 from sheaf.models.user import User
 from sheaf.schemas.document import DocumentList, DocumentRead
-from sheaf.services.cache import cache_delete, cache_get, cache_set
+from sheaf.services.blobs import acquire_blob, release_blob
+from sheaf.services.cache import document_cache
+from sheaf.services.counters import download_counter
+from sheaf.services.delivery import opens_document, resolve_source, serve_document
+from sheaf.services.linearize import run_linearize_background
+from sheaf.services.render import PageOutOfRange, RenderError, page_renderer
+from sheaf.services.search_cache import search_cache
+from sheaf.services.uploads import hash_upload, upload_too_large
 
 router = APIRouter(prefix="/api/documents", tags=["documents"])
 
@@ -18,6 +38,7 @@ router = APIRouter(prefix="/api/documents", tags=["documents"])
 @router.post("/upload", response_model=DocumentRead, status_code=status.HTTP_201_CREATED)
 async def upload_pdf(
     file: UploadFile,
+    background_tasks: BackgroundTasks,
     is_public: bool = False,
     db: AsyncSession = Depends(get_db),
     user: User = Depends(get_current_user),
@@ -28,24 +49,37 @@ async def upload_pdf(
             detail="Only PDF files are allowed",
         )
 
-    data = await file.read()
+    if file.size is not None and file.size > settings.max_upload_bytes:
+        raise upload_too_large(settings.max_upload_bytes)
+
     stored_name = f"{uuid.uuid4().hex}.pdf"
     storage = get_user_storage(user)
-    storage_path = await storage.save(stored_name, data)
+    upload = await hash_upload(file, storage, stored_name, settings.max_upload_bytes)
+    blob = await acquire_blob(db, storage, upload)
 
     doc = Document(
-        filename=stored_name,
+        filename=Path(blob.storage_path).name,
         original_name=file.filename or "untitled.pdf",
         content_type=file.content_type,
-        size_bytes=len(data),
+        size_bytes=blob.size_bytes,
+        content_hash=blob.content_hash,
+        blob_id=blob.id,
         storage_backend=user.storage_backend,
-        storage_path=storage_path,
+        storage_path=blob.storage_path,
         is_public=is_public,
         owner_id=user.id,
     )
+    if blob.linearized_path is not None:
+        doc.linearize_status = "completed"
+    elif settings.linearize_enabled:
+        doc.linearize_status = "pending"
     db.add(doc)
     await db.commit()
     await db.refresh(doc)
+    await search_cache.bump(user.id)
+
+    if doc.linearize_status == "pending":
+        background_tasks.add_task(run_linearize_background, doc.id)
     return doc
 
 
@@ -62,7 +96,7 @@ async def list_documents(
     result = await db.execute(
         select(Document).where(where).offset(skip).limit(limit).order_by(Document.created_at.desc())
     )
-    items = list(result.scalars().all())
+    items = [download_counter.merge(DocumentRead.model_validate(d)) for d in result.scalars()]
     return DocumentList(items=items, total=total)
 
 
@@ -73,58 +107,59 @@ async def get_document(
     user: User = Depends(get_current_user),
 ):
     doc = await _get_doc_or_404(db, doc_id, user)
-    return doc
+    return download_counter.merge(DocumentRead.model_validate(doc))
 
 
 @router.get("/{doc_id}/download")
 async def download_document(
     doc_id: str,
+    request: Request,
     db: AsyncSession = Depends(get_db),
     user: User = Depends(get_current_user),
 ):
     doc = await _get_doc_or_404(db, doc_id, user)
 
-    cache_key = f"pdf:{doc.id}"
-    cached = await cache_get(cache_key)
-    if cached is not None:
-        data = cached
-    else:
-        storage = await get_document_storage(doc, db)
-        data = await storage.load(doc.storage_path)
-        await cache_set(cache_key, data)
-
-    doc.download_count += 1
-    await db.commit()
-
-    return Response(
-        content=data,
-        media_type="application/pdf",
-        headers={"Content-Disposition": f'attachment; filename="{doc.original_name}"'},
-    )
+    response = await serve_document(request, doc, db, disposition="attachment")
+    if opens_document(response):
+        download_counter.incr(doc.id)
+    return response
 
 
 @router.get("/{doc_id}/view")
 async def view_document(
     doc_id: str,
+    request: Request,
     db: AsyncSession = Depends(get_db),
     user: User = Depends(get_current_user),
 ):
     doc = await _get_doc_or_404(db, doc_id, user)
+    return await serve_document(request, doc, db, disposition="inline", prefer_linearized=True)
 
-    cache_key = f"pdf:{doc.id}"
-    cached = await cache_get(cache_key)
-    if cached is not None:
-        data = cached
-    else:
-        storage = await get_document_storage(doc, db)
-        data = await storage.load(doc.storage_path)
-        await cache_set(cache_key, data)
-
-    return Response(
-        content=data,
-        media_type="application/pdf",
-        headers={"Content-Disposition": f'inline; filename="{doc.original_name}"'},
-    )
+
+@router.get("/{doc_id}/pages/{page}.webp")
+async def render_page(
+    doc_id: str,
+    page: int,
+    width: int = Query(default=800, ge=32, le=2048),
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    doc = await _get_doc_or_404(db, doc_id, user)
+    if page < 1:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Page not found")
+    # Snap to a 16px grid so near-identical widths share cache entries.
+    width = max(32, round(width / 16) * 16)
+    return await _page_image(doc, db, page, width)
+
+
+@router.get("/{doc_id}/thumbnail.webp")
+async def render_thumbnail(
+    doc_id: str,
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    doc = await _get_doc_or_404(db, doc_id, user)
+    return await _page_image(doc, db, 1, settings.thumbnail_width)
 
 
 @router.delete("/{doc_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -135,10 +170,34 @@ async def delete_document(
 ):
     doc = await _get_doc_or_404(db, doc_id, user)
     storage = await get_document_storage(doc, db)
-    await storage.delete(doc.storage_path)
-    await cache_delete(f"pdf:{doc.id}")
+    variant = await resolve_source(doc, db, prefer_linearized=True)
+    orphaned_paths = await release_blob(db, doc)
+    await db.execute(delete(DocumentPage).where(DocumentPage.document_id == doc.id))
+    await db.execute(delete(OCRJob).where(OCRJob.document_id == doc.id))
     await db.delete(doc)
     await db.commit()
+    await search_cache.bump(doc.owner_id)  # an admin may delete others' documents
+    for path in orphaned_paths:
+        await storage.delete(path)
+    await document_cache.delete(f"pdf:{doc.id}", doc.size_bytes)
+    if variant.cache_key != f"pdf:{doc.id}":
+        await document_cache.delete(variant.cache_key, variant.size)
+    download_counter.discard(doc.id)
+
+
+async def _page_image(doc: Document, db: AsyncSession, page: int, width: int) -> FileResponse:
+    try:
+        path = await page_renderer.render_page(doc, db, page, width)
+    except PageOutOfRange:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Page not found")
+    except RenderError:
+        raise HTTPException(status_code=422, detail="Could not read this PDF")
+    # Renders are keyed by immutable content, so clients may reuse them.
+    return FileResponse(
+        path,
+        media_type="image/webp",
+        headers={"Cache-Control": "private, max-age=86400"},
+    )
 
 
 async def _get_doc_or_404(db: AsyncSession, doc_id: str, user: User) -> Document:
@@ -1,47 +1,50 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
-from sqlalchemy import select
+import asyncio
+import json
+from collections.abc import AsyncIterator
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import and_, func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from sheaf.config import settings
 from sheaf.database import get_db
-from sheaf.dependencies import get_current_user
+from sheaf.dependencies import get_current_user, get_stream_user
 from sheaf.models.document import Document
+from sheaf.models.document_page import DocumentPage
 from sheaf.models.user import User
-from sheaf.schemas.ocr import OCRStatusResponse, OCRTextResponse, OCRStartResponse
-from sheaf.services.ocr import OCRService
+from sheaf.schemas.ocr import (
+    OCRCancelResponse,
+    OCRPageInfo,
+    OCRPagesResponse,
+    OCRStartResponse,
+    OCRStatusResponse,
+    OCRTextResponse,
+)
+from sheaf.services.ocr_events import ocr_events
+from sheaf.services.ocr_queue import active_job, cancel_job, enqueue_ocr
 
 router = APIRouter(prefix="/api/ocr", tags=["ocr"])
 
 
-async def run_ocr_background(doc_id: str, user_id: str, language: str):
-    """Background task for OCR processing."""
-    from sheaf.database import async_session
-
-    async with async_session() as db:
-        service = OCRService(language=language)
-        try:
-            await service.process_document(doc_id, db, user_id)
-        except Exception as e:
-            result = await db.execute(
-                select(Document).where(Document.id == doc_id)
-            )
-            doc = result.scalar_one_or_none()
-            if doc:
-                doc.ocr_status = "failed"
-                doc.ocr_error = str(e)[:500]
-                await db.commit()
-
-
 @router.post("/{doc_id}/start", response_model=OCRStartResponse)
 async def start_ocr(
     doc_id: str,
-    background_tasks: BackgroundTasks,
+    priority: int = Query(default=0, ge=-10, le=10),
+    mode: Literal["auto", "text-only", "ocr-only"] = "auto",
     db: AsyncSession = Depends(get_db),
     user: User = Depends(get_current_user),
 ):
-    """Start OCR processing for a document."""
+    """Start OCR processing for a document.
+
+    Only admins may queue ahead of the default priority; other users can
+    lower it, and higher values are capped at 0.
+    """
     if not settings.ocr_enabled:
         raise HTTPException(status_code=400, detail="OCR is disabled")
+    if not user.is_admin:
+        priority = min(priority, 0)
 
     result = await db.execute(
         select(Document).where(Document.id == doc_id, Document.owner_id == user.id)
@@ -50,28 +53,28 @@ async def start_ocr(
     if not doc:
         raise HTTPException(status_code=404, detail="Document not found")
 
-    if doc.ocr_status == "processing":
+    if await active_job(db, doc_id) is not None:
         raise HTTPException(status_code=400, detail="OCR already in progress")
 
-    doc.ocr_status = "pending"
+    job = await enqueue_ocr(db, doc, settings.ocr_language, priority=priority, mode=mode)
     await db.commit()
-
-    background_tasks.add_task(run_ocr_background, doc_id, user.id, settings.ocr_language)
+    await ocr_events.publish(user.id, doc_id, "pending")
 
     return OCRStartResponse(
         doc_id=doc_id,
-        message="OCR processing started",
+        message="OCR processing queued",
         ocr_status="pending",
+        job_id=job.id,
     )
 
 
-@router.get("/{doc_id}/status", response_model=OCRStatusResponse)
-async def get_ocr_status(
+@router.post("/{doc_id}/cancel", response_model=OCRCancelResponse)
+async def cancel_ocr(
     doc_id: str,
     db: AsyncSession = Depends(get_db),
     user: User = Depends(get_current_user),
 ):
-    """Get OCR status for a document."""
+    """Cancel queued or running OCR for a document."""
     result = await db.execute(
         select(Document).where(Document.id == doc_id, Document.owner_id == user.id)
     )
@@ -79,15 +82,140 @@ async def get_ocr_status(
     if not doc:
         raise HTTPException(status_code=404, detail="Document not found")
 
+    job = await active_job(db, doc_id)
+    if job is None or not await cancel_job(db, job):
+        raise HTTPException(status_code=400, detail="No OCR in progress")
+
+    await db.commit()
+    await ocr_events.publish(user.id, doc_id, "cancelled")
+
+    return OCRCancelResponse(doc_id=doc_id, job_id=job.id, ocr_status="cancelled")
+
+
+@router.get("/{doc_id}/status", response_model=OCRStatusResponse)
+async def get_ocr_status(
+    doc_id: str,
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    """Get OCR status for a document."""
+    # Select columns so the (possibly huge) extracted_text is never loaded.
+    result = await db.execute(
+        select(
+            Document.ocr_status,
+            Document.ocr_error,
+            Document.text_extracted_at,
+            and_(Document.extracted_text.is_not(None), Document.extracted_text != ""),
+            Document.ocr_pages_done,
+            Document.ocr_pages_total,
+        ).where(Document.id == doc_id, Document.owner_id == user.id)
+    )
+    row = result.one_or_none()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Document not found")
+    ocr_status, ocr_error, extracted_at, has_text, pages_done, pages_total = row
+
     return OCRStatusResponse(
         doc_id=doc_id,
-        ocr_status=doc.ocr_status or "none",
-        ocr_error=doc.ocr_error,
-        text_extracted_at=doc.text_extracted_at,
-        has_text=bool(doc.extracted_text),
+        ocr_status=ocr_status or "none",
+        ocr_error=ocr_error,
+        text_extracted_at=extracted_at,
+        has_text=bool(has_text),
+        pages_done=pages_done or 0,
+        pages_total=pages_total,
     )
 
 
+async def _snapshots(db: AsyncSession, *conditions) -> list[dict]:
+    result = await db.execute(
+        select(
+            Document.id,
+            Document.ocr_status,
+            Document.ocr_error,
+            Document.ocr_pages_done,
+            Document.ocr_pages_total,
+        ).where(*conditions)
+    )
+    return [
+        {
+            "doc_id": doc_id,
+            "ocr_status": ocr_status or "none",
+            "ocr_error": ocr_error,
+            "pages_done": pages_done or 0,
+            "pages_total": pages_total,
+        }
+        for doc_id, ocr_status, ocr_error, pages_done, pages_total in result.all()
+    ]
+
+
+def _sse(event: dict) -> str:
+    return f"data: {json.dumps(event)}\n\n"
+
+
+async def event_stream(
+    user_id: str, queue: asyncio.Queue, snapshots: list[dict], doc_id: str | None = None
+) -> AsyncIterator[str]:
+    """Current state first, then every change published for `user_id` (or one document)."""
+    try:
+        for event in snapshots:
+            yield _sse(event)
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), settings.ocr_events_keepalive_seconds)
+            except TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            if doc_id is None or event["doc_id"] == doc_id:
+                yield _sse(event)
+    finally:
+        ocr_events.unsubscribe(user_id, queue)
+
+
+def _stream_response(body: AsyncIterator[str]) -> StreamingResponse:
+    return StreamingResponse(
+        body,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/events")
+async def stream_all_ocr_events(
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_stream_user),
+):
+    """SSE stream of OCR status/progress for all of the user's documents.
+
+    Starts with the documents whose OCR is pending or running.
+    """
+    # Subscribe before reading state so no change falls in between.
+    queue = await ocr_events.subscribe(user.id)
+    snapshots = await _snapshots(
+        db,
+        Document.owner_id == user.id,
+        Document.ocr_status.in_(("pending", "processing")),
+    )
+    # Streams are long-lived; don't hold a pooled connection for their lifetime.
+    await db.close()
+    return _stream_response(event_stream(user.id, queue, snapshots))
+
+
+@router.get("/{doc_id}/events")
+async def stream_ocr_events(
+    doc_id: str,
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_stream_user),
+):
+    """SSE stream of OCR status/progress for one document, starting with its current state."""
+    queue = await ocr_events.subscribe(user.id)
+    snapshots = await _snapshots(db, Document.id == doc_id, Document.owner_id == user.id)
+    await db.close()
+    if not snapshots:
+        ocr_events.unsubscribe(user.id, queue)
+        raise HTTPException(status_code=404, detail="Document not found")
+    return _stream_response(event_stream(user.id, queue, snapshots, doc_id))
+
+
 @router.get("/{doc_id}/text", response_model=OCRTextResponse)
 async def get_ocr_text(
     doc_id: str,
@@ -107,3 +235,30 @@ async def get_ocr_text(
         extracted_text=doc.extracted_text,
         text_length=len(doc.extracted_text) if doc.extracted_text else 0,
     )
+
+
+@router.get("/{doc_id}/pages", response_model=OCRPagesResponse)
+async def get_ocr_pages(
+    doc_id: str,
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    """List extracted pages and whether each came from the text layer or OCR."""
+    result = await db.execute(
+        select(Document.id).where(Document.id == doc_id, Document.owner_id == user.id)
+    )
+    if result.scalar_one_or_none() is None:
+        raise HTTPException(status_code=404, detail="Document not found")
+
+    rows = await db.execute(
+        select(DocumentPage.page_no, DocumentPage.method, func.length(DocumentPage.text))
+        .where(DocumentPage.document_id == doc_id)
+        .order_by(DocumentPage.page_no)
+    )
+    return OCRPagesResponse(
+        doc_id=doc_id,
+        pages=[
+            OCRPageInfo(page_no=page_no, method=method, text_length=length or 0)
+            for page_no, method, length in rows
+        ],
+    )
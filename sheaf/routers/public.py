@@ -1,13 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.responses import Response
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from sheaf.database import get_db
-from sheaf.dependencies import get_document_storage
 from sheaf.models.document import Document
 from sheaf.schemas.document import DocumentRead
-from sheaf.services.cache import cache_get, cache_set
+from sheaf.services.counters import download_counter
+from sheaf.services.delivery import opens_document, serve_document
 
 router = APIRouter(prefix="/api/public", tags=["public"])
 
@@ -15,33 +14,21 @@ router = APIRouter(prefix="/api/public", tags=["public"])
 @router.get("/{doc_id}", response_model=DocumentRead)
 async def get_public_document(doc_id: str, db: AsyncSession = Depends(get_db)):
     doc = await _get_public_or_404(db, doc_id)
-    return doc
+    return download_counter.merge(DocumentRead.model_validate(doc))
 
 
 @router.get("/{doc_id}/download")
 async def download_public_document(
     doc_id: str,
+    request: Request,
     db: AsyncSession = Depends(get_db),
 ):
     doc = await _get_public_or_404(db, doc_id)
 
-    cache_key = f"pdf:{doc.id}"
-    cached = await cache_get(cache_key)
-    if cached is not None:
-        data = cached
-    else:
-        storage = await get_document_storage(doc, db)
-        data = await storage.load(doc.storage_path)
-        await cache_set(cache_key, data)
-
-    doc.download_count += 1
-    await db.commit()
-
-    return Response(
-        content=data,
-        media_type="application/pdf",
-        headers={"Content-Disposition": f'attachment; filename="{doc.original_name}"'},
-    )
+    response = await serve_document(request, doc, db, disposition="attachment")
+    if opens_document(response):
+        download_counter.incr(doc.id)
+    return response
 
 
 async def _get_public_or_404(db: AsyncSession, doc_id: str) -> Document:
@@ -4,17 +4,29 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sheaf.database import get_db
 from sheaf.dependencies import get_current_user
 from sheaf.models.user import User
-from sheaf.schemas.search import SearchResponse, SearchResultItem
-from sheaf.services.search import search_service
+from sheaf.schemas.search import (
+    SearchPageHit,
+    SearchResponse,
+    SearchResultItem,
+    SearchSnippet,
+    SearchSnippetsRequest,
+    SearchSnippetsResponse,
+)
+from sheaf.services.search import SearchResult, search_service
 
 router = APIRouter(prefix="/api/search", tags=["search"])
 
 
+def _pages(result: SearchResult) -> list[SearchPageHit]:
+    return [SearchPageHit(page_no=p.page_no, snippet=p.snippet) for p in result.pages]
+
+
 @router.get("", response_model=SearchResponse)
 async def search_documents(
     q: str = Query(..., min_length=1, description="Search query"),
     limit: int = Query(20, ge=1, le=100),
     offset: int = Query(0, ge=0),
+    snippets: bool = Query(True, description="Include page hits and snippets"),
     db: AsyncSession = Depends(get_db),
     user: User = Depends(get_current_user),
 ):
@@ -25,6 +37,7 @@ async def search_documents(
         db=db,
         limit=limit,
         offset=offset,
+        snippets=snippets,
     )
 
     return SearchResponse(
@@ -36,7 +49,22 @@ async def search_documents(
                 original_name=r.original_name,
                 snippet=r.snippet,
                 rank=r.rank,
+                pages=_pages(r),
             )
             for r in results
         ],
     )
+
+
+@router.post("/snippets", response_model=SearchSnippetsResponse)
+async def search_snippets(
+    data: SearchSnippetsRequest,
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    """Page hits and snippets for results fetched with `snippets=false`."""
+    results = await search_service.snippets(data.q, user.id, db, data.ids)
+    return SearchSnippetsResponse(
+        query=data.q,
+        items=[SearchSnippet(id=r.id, snippet=r.snippet, pages=_pages(r)) for r in results],
+    )
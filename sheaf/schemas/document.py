@@ -10,6 +10,7 @@ class DocumentRead(BaseModel):
     original_name: str
     content_type: str
     size_bytes: int
+    content_hash: Optional[str] = None
     storage_backend: str
     is_public: bool
     download_count: int
@@ -20,6 +21,7 @@ class DocumentRead(BaseModel):
     ocr_error: Optional[str] = None
     text_extracted_at: Optional[datetime] = None
     has_text: bool = False
+    linearize_status: Optional[str] = "none"
     # Calibre fields
     calibre_id: Optional[str] = None
     calibre_metadata: Optional[dict] = None
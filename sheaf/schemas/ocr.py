@@ -1,7 +1,7 @@
 from datetime import datetime
-from typing import Optional
+from typing import Literal, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class OCRStatusResponse(BaseModel):
@@ -10,6 +10,8 @@ class OCRStatusResponse(BaseModel):
     ocr_error: Optional[str] = None
     text_extracted_at: Optional[datetime] = None
     has_text: bool
+    pages_done: int = 0
+    pages_total: Optional[int] = None
 
 
 class OCRTextResponse(BaseModel):
@@ -22,3 +24,45 @@ class OCRStartResponse(BaseModel):
     doc_id: str
     message: str
     ocr_status: str
+    job_id: Optional[str] = None
+
+
+class OCRCancelResponse(BaseModel):
+    doc_id: str
+    job_id: str
+    ocr_status: str
+
+
+class OCRPageInfo(BaseModel):
+    page_no: int
+    method: str
+    text_length: int
+
+
+class OCRPagesResponse(BaseModel):
+    doc_id: str
+    pages: list[OCRPageInfo]
+
+
+class OCRBackfillCreate(BaseModel):
+    owner_id: Optional[str] = None
+    ocr_status: list[str] = ["none"]
+    min_size_bytes: Optional[int] = Field(default=None, ge=0)
+    max_size_bytes: Optional[int] = Field(default=None, ge=0)
+    mode: Literal["auto", "text-only", "ocr-only"] = "auto"
+    max_per_hour: Optional[int] = Field(default=None, ge=0)
+    window: Optional[str] = Field(default=None, pattern=r"^(\d{2}:\d{2}-\d{2}:\d{2})?$")
+    priority: Optional[int] = Field(default=None, ge=-10, le=10)
+
+
+class OCRBackfillRead(BaseModel):
+    id: str
+    filters: dict
+    mode: str
+    priority: int
+    max_per_hour: int
+    window: str
+    status: str
+    total_jobs: int
+    created_at: Optional[datetime] = None
+    progress: dict[str, int]
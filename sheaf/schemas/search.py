@@ -1,4 +1,9 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+
+class SearchPageHit(BaseModel):
+    page_no: int
+    snippet: str
 
 
 class SearchResultItem(BaseModel):
@@ -6,9 +11,26 @@ class SearchResultItem(BaseModel):
     original_name: str
     snippet: str
     rank: float
+    pages: list[SearchPageHit] = []
 
 
 class SearchResponse(BaseModel):
     query: str
     total: int
     items: list[SearchResultItem]
+
+
+class SearchSnippetsRequest(BaseModel):
+    q: str = Field(min_length=1)
+    ids: list[str] = Field(max_length=100)
+
+
+class SearchSnippet(BaseModel):
+    id: str
+    snippet: str
+    pages: list[SearchPageHit] = []
+
+
+class SearchSnippetsResponse(BaseModel):
+    query: str
+    items: list[SearchSnippet]
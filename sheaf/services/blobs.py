@@ -0,0 +1,126 @@
+"""Content-addressed, reference-counted file storage.
+
+Documents with identical bytes in the same storage namespace share one
+stored file (a `Blob`). Uploads are hashed first and only written to
+storage when no blob with the same SHA-256 exists yet, and the stored file
+is only removed when its last document goes away.
+"""
+
+import hashlib
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from sheaf.models.blob import Blob
+from sheaf.models.document import Document
+from sheaf.services.storage import StorageBackend
+from sheaf.services.uploads import HashedUpload
+
+
+async def _find_blob(db: AsyncSession, namespace: str, content_hash: str) -> Blob | None:
+    result = await db.execute(
+        select(Blob).where(Blob.namespace == namespace, Blob.content_hash == content_hash)
+    )
+    return result.scalar_one_or_none()
+
+
+async def _add_ref(db: AsyncSession, blob: Blob) -> bool:
+    result = await db.execute(
+        update(Blob).where(Blob.id == blob.id).values(ref_count=Blob.ref_count + 1)
+    )
+    if result.rowcount != 1:
+        return False
+    await db.refresh(blob)
+    return True
+
+
+async def acquire_blob(
+    db: AsyncSession,
+    storage: StorageBackend,
+    upload: HashedUpload,
+) -> Blob:
+    """Return a referenced blob for an upload, writing it to storage only if new.
+
+    The caller must attach the blob to a document and commit the session.
+    """
+    existing = await _find_blob(db, storage.namespace, upload.content_hash)
+    if existing is not None and await _add_ref(db, existing):
+        return existing
+
+    storage_path = await upload.store()
+    blob = Blob(
+        namespace=storage.namespace,
+        content_hash=upload.content_hash,
+        storage_path=storage_path,
+        size_bytes=upload.size_bytes,
+        ref_count=1,
+    )
+    try:
+        async with db.begin_nested():
+            db.add(blob)
+    except IntegrityError:
+        # A concurrent upload of the same bytes won the race; use its blob.
+        await storage.delete(storage_path)
+        existing = await _find_blob(db, storage.namespace, upload.content_hash)
+        if existing is None or not await _add_ref(db, existing):
+            raise
+        return existing
+    return blob
+
+
+async def release_blob(db: AsyncSession, doc: Document) -> list[str]:
+    """Drop `doc`'s reference; return the storage paths that became orphaned.
+
+    Delete the returned paths only after the session has been committed, so
+    a failed transaction never leaves documents pointing at a missing file.
+    """
+    if doc.blob_id is None:
+        return [doc.storage_path]
+    await db.execute(
+        update(Blob).where(Blob.id == doc.blob_id).values(ref_count=Blob.ref_count - 1)
+    )
+    blob = await db.get(Blob, doc.blob_id, populate_existing=True)
+    if blob is None or blob.ref_count > 0:
+        return []
+    await db.delete(blob)
+    paths = [blob.storage_path]
+    if blob.linearized_path and blob.linearized_path != blob.storage_path:
+        paths.append(blob.linearized_path)
+    return paths
+
+
+async def dedupe_document(db: AsyncSession, doc: Document, storage: StorageBackend) -> bool:
+    """Backfill: hash a pre-dedup document and attach it to a shared blob.
+
+    Returns True when the document's own file became redundant and was removed.
+    """
+    if doc.content_hash is None:
+        digest = hashlib.sha256()
+        async for chunk in storage.iter_chunks(doc.storage_path):
+            digest.update(chunk)
+        doc.content_hash = digest.hexdigest()
+
+    existing = await _find_blob(db, storage.namespace, doc.content_hash)
+    if existing is not None and await _add_ref(db, existing):
+        redundant = existing.storage_path != doc.storage_path
+        old_path = doc.storage_path
+        doc.blob_id = existing.id
+        doc.storage_path = existing.storage_path
+        await db.commit()
+        if redundant:
+            await storage.delete(old_path)
+        return redundant
+
+    blob = Blob(
+        namespace=storage.namespace,
+        content_hash=doc.content_hash,
+        storage_path=doc.storage_path,
+        size_bytes=doc.size_bytes,
+        ref_count=1,
+    )
+    db.add(blob)
+    await db.flush()
+    doc.blob_id = blob.id
+    await db.commit()
+    return False
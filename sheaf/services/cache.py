@@ -1,6 +1,14 @@
+import asyncio
+import json
+import uuid
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager
+
 import redis.asyncio as redis
 
 from sheaf.config import settings
+from sheaf.services.singleflight import SingleFlight
 
 _pool: redis.Redis | None = None
 
@@ -12,23 +20,353 @@ async def get_redis() -> redis.Redis:
     return _pool
 
 
-async def cache_get(key: str) -> bytes | None:
-    r = await get_redis()
-    return await r.get(key)
+async def close_redis() -> None:
+    global _pool
+    if _pool is not None:
+        await _pool.aclose()
+        _pool = None
+
 
+# Delete the lock only if we still own it.
+_RELEASE_LOCK = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
 
-async def cache_set(key: str, value: bytes, ttl: int | None = None) -> None:
-    r = await get_redis()
-    await r.set(key, value, ex=ttl or settings.cache_ttl_seconds)
 
+class LRUByteCache:
+    """In-process LRU cache bounded by total payload size rather than entry count."""
 
-async def cache_delete(key: str) -> None:
-    r = await get_redis()
-    await r.delete(key)
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.evictions = 0
+        self._entries: OrderedDict[str, bytes] = OrderedDict()
 
+    def __len__(self) -> int:
+        return len(self._entries)
 
-async def close_redis() -> None:
-    global _pool
-    if _pool is not None:
-        await _pool.aclose()
-        _pool = None
+    def get(self, key: str) -> bytes | None:
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: bytes) -> bool:
+        """Store `value`, evicting least recently used entries to make room."""
+        if len(value) > self.max_bytes:
+            return False
+        self.delete(key)
+        while self._entries and self.current_bytes + len(value) > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.current_bytes -= len(evicted)
+            self.evictions += 1
+        self._entries[key] = value
+        self.current_bytes += len(value)
+        return True
+
+    def delete(self, key: str) -> None:
+        value = self._entries.pop(key, None)
+        if value is not None:
+            self.current_bytes -= len(value)
+
+
+class FrequencyAdmission:
+    """Admit a key only after it has been requested `min_hits` times.
+
+    Counts are halved once `max_tracked` keys are seen (the aging step from
+    TinyLFU), so one-off requests for big, rarely read files never displace
+    the working set.
+    """
+
+    def __init__(self, min_hits: int, max_tracked: int = 10_000) -> None:
+        self.min_hits = min_hits
+        self.max_tracked = max_tracked
+        self._counts: dict[str, int] = {}
+
+    def record(self, key: str) -> int:
+        if key not in self._counts and len(self._counts) >= self.max_tracked:
+            self._age()
+        count = self._counts.get(key, 0) + 1
+        self._counts[key] = count
+        return count
+
+    def admits(self, key: str) -> bool:
+        return self._counts.get(key, 0) >= self.min_hits
+
+    def forget(self, key: str) -> None:
+        self._counts.pop(key, None)
+
+    def _age(self) -> None:
+        self._counts = {k: c // 2 for k, c in self._counts.items() if c > 1}
+
+
+class DocumentCache:
+    """Two-tier, chunked PDF cache: a bounded in-process LRU in front of Redis.
+
+    A document is cached as fixed-size chunks (`{key}:c:{n}`) plus a small
+    manifest (`{key}:m`), so a range request only touches the chunks that
+    overlap it. Missing chunks are filled lazily through a caller-supplied
+    loader, with concurrent misses coalesced so storage is read once. Redis
+    is treated as best-effort: connection errors count as misses so a cache
+    outage degrades to reading from storage.
+    """
+
+    def __init__(
+        self,
+        memory_bytes: int,
+        max_object_bytes: int,
+        admit_after_hits: int,
+        chunk_size: int,
+        ttl: int,
+        lock_timeout: float = 5.0,
+    ) -> None:
+        self.memory = LRUByteCache(memory_bytes)
+        self.admission = FrequencyAdmission(admit_after_hits)
+        self.max_object_bytes = max_object_bytes
+        self.chunk_size = chunk_size
+        self.ttl = ttl
+        self.memory_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.rejected = 0
+        self.redis_errors = 0
+        self.coalesced = 0
+        self.lock_timeout = lock_timeout
+        self.flights = SingleFlight()
+
+    @staticmethod
+    def chunk_key(key: str, n: int) -> str:
+        return f"{key}:c:{n}"
+
+    @staticmethod
+    def manifest_key(key: str) -> str:
+        return f"{key}:m"
+
+    def should_admit(self, key: str, size: int, start: int = 0) -> bool:
+        """Decide whether to serve a request for `key` via the cache.
+
+        Only requests starting at byte 0 (a full GET, or the first range a
+        viewer fetches when opening a document) count as a hit: a viewer
+        paging through one copy sends many ranges and must not admit it on
+        its own.
+        """
+        if start == 0:
+            self.admission.record(key)
+        if size <= self.max_object_bytes and self.admission.admits(key):
+            return True
+        self.rejected += 1
+        return False
+
+    async def iter_range(
+        self,
+        key: str,
+        size: int,
+        start: int,
+        end: int,
+        loader: Callable[[int, int], Awaitable[bytes]],
+        batch: int = 8,
+    ) -> AsyncIterator[bytes]:
+        """Yield bytes `[start, end)` of a cached document, filling missing chunks.
+
+        `loader(offset, length)` reads from the storage backend; consecutive
+        missing chunks are fetched with a single ranged read.
+        """
+        if end <= start:
+            return
+        cs = self.chunk_size
+        first, last = start // cs, (end - 1) // cs
+        for batch_start in range(first, last + 1, batch):
+            indices = list(range(batch_start, min(batch_start + batch, last + 1)))
+            chunks = await self._get_chunks(key, indices)
+            await self._fill_missing(key, size, indices, chunks, loader)
+            for n, chunk in zip(indices, chunks):
+                lo = max(start - n * cs, 0)
+                hi = min(end - n * cs, len(chunk))
+                yield chunk[lo:hi]
+
+    async def _get_chunks(self, key: str, indices: list[int]) -> list[bytes | None]:
+        keys = [self.chunk_key(key, n) for n in indices]
+        chunks: list[bytes | None] = [self.memory.get(k) for k in keys]
+        self.memory_hits += sum(c is not None for c in chunks)
+
+        remote = [i for i, c in enumerate(chunks) if c is None]
+        if remote:
+            try:
+                r = await get_redis()
+                values = await r.mget([keys[i] for i in remote])
+            except redis.RedisError:
+                self.redis_errors += 1
+                values = [None] * len(remote)
+            for i, value in zip(remote, values):
+                if value is not None:
+                    self.redis_hits += 1
+                    self.memory.set(keys[i], value)
+                    chunks[i] = value
+                else:
+                    self.misses += 1
+        return chunks
+
+    async def _fill_missing(
+        self,
+        key: str,
+        size: int,
+        indices: list[int],
+        chunks: list[bytes | None],
+        loader: Callable[[int, int], Awaitable[bytes]],
+    ) -> None:
+        """Fill `None` entries of `chunks`, loading each missing chunk only once.
+
+        Chunks another request in this process is already loading are awaited
+        via single-flight; the rest are loaded in one detached fill, so a
+        request that goes away mid-fill does not fail the requests waiting on
+        it. The fill runs under a short Redis lock so concurrent workers wait
+        for the first loader's result instead of each fetching the same bytes
+        from storage.
+        """
+        followers: dict[int, asyncio.Task] = {}
+        claimed: list[int] = []
+        for i, chunk in enumerate(chunks):
+            if chunk is not None:
+                continue
+            task = self.flights.inflight(self.chunk_key(key, indices[i]))
+            if task is not None:
+                followers[i] = task
+            else:
+                claimed.append(i)
+
+        if claimed:
+            numbers = [indices[i] for i in claimed]
+            fill = self.flights.start(
+                [self.chunk_key(key, n) for n in numbers],
+                lambda: self._fill(key, size, numbers, loader),
+            )
+            filled = await asyncio.shield(fill)
+            for i in claimed:
+                chunks[i] = filled[indices[i]]
+
+        for i, task in followers.items():
+            chunks[i] = (await asyncio.shield(task))[indices[i]]
+            self.coalesced += 1
+
+    async def _fill(
+        self,
+        key: str,
+        size: int,
+        numbers: list[int],
+        loader: Callable[[int, int], Awaitable[bytes]],
+    ) -> dict[int, bytes]:
+        """Chunks `numbers` of a document, loaded from storage where still missing."""
+        async with self._fill_lock(key):
+            # Another worker may have filled these while we waited for the lock.
+            refreshed = await self._get_chunks(key, numbers)
+            filled = {n: chunk for n, chunk in zip(numbers, refreshed) if chunk is not None}
+
+            cs = self.chunk_size
+            todo = [n for n in numbers if n not in filled]
+            while todo:
+                run = [todo[0]]
+                while len(run) < len(todo) and todo[len(run)] == run[-1] + 1:
+                    run.append(todo[len(run)])
+                todo = todo[len(run) :]
+
+                offset = run[0] * cs
+                length = min((run[-1] + 1) * cs, size) - offset
+                data = await loader(offset, length)
+                stored = {}
+                for k, n in enumerate(run):
+                    filled[n] = data[k * cs : (k + 1) * cs]
+                    stored[self.chunk_key(key, n)] = filled[n]
+                await self._store(key, size, stored)
+        return filled
+
+    @asynccontextmanager
+    async def _fill_lock(self, key: str) -> AsyncIterator[None]:
+        """Best-effort cross-worker lock around filling a document's chunks."""
+        lock_key = f"{key}:lock"
+        token = uuid.uuid4().hex
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.lock_timeout
+        acquired = False
+        while True:
+            try:
+                r = await get_redis()
+                acquired = bool(
+                    await r.set(lock_key, token, nx=True, px=int(self.lock_timeout * 1000))
+                )
+            except redis.RedisError:
+                self.redis_errors += 1
+                break
+            if acquired or loop.time() >= deadline:
+                break
+            await asyncio.sleep(0.05)
+        try:
+            yield
+        finally:
+            if acquired:
+                try:
+                    await r.eval(_RELEASE_LOCK, 1, lock_key, token)
+                except redis.RedisError:
+                    self.redis_errors += 1
+
+    async def _store(self, key: str, size: int, chunks: dict[str, bytes]) -> None:
+        for chunk_key, chunk in chunks.items():
+            self.memory.set(chunk_key, chunk)
+        manifest = json.dumps(
+            {"size": size, "chunk_size": self.chunk_size, "chunks": -(-size // self.chunk_size)}
+        )
+        try:
+            r = await get_redis()
+            async with r.pipeline(transaction=False) as pipe:
+                pipe.set(self.manifest_key(key), manifest, ex=self.ttl)
+                for chunk_key, chunk in chunks.items():
+                    pipe.set(chunk_key, chunk, ex=self.ttl)
+                await pipe.execute()
+        except redis.RedisError:
+            self.redis_errors += 1
+
+    async def delete(self, key: str, size: int) -> None:
+        """Drop the manifest and every chunk of a document in one DEL."""
+        chunk_size = self.chunk_size
+        try:
+            r = await get_redis()
+            raw = await r.get(self.manifest_key(key))
+            if raw is not None:
+                chunk_size = json.loads(raw)["chunk_size"]
+        except redis.RedisError:
+            self.redis_errors += 1
+        count = -(-size // chunk_size)
+        keys = [self.manifest_key(key)] + [self.chunk_key(key, n) for n in range(count)]
+        for k in keys:
+            self.memory.delete(k)
+        self.admission.forget(key)
+        try:
+            r = await get_redis()
+            await r.delete(*keys)
+        except redis.RedisError:
+            self.redis_errors += 1
+
+    def stats(self) -> dict:
+        return {
+            "memory_hits": self.memory_hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "rejected": self.rejected,
+            "evictions": self.memory.evictions,
+            "redis_errors": self.redis_errors,
+            "coalesced": self.coalesced,
+            "memory_entries": len(self.memory),
+            "memory_bytes": self.memory.current_bytes,
+        }
+
+
+document_cache = DocumentCache(
+    memory_bytes=settings.cache_memory_bytes,
+    max_object_bytes=settings.cache_max_object_bytes,
+    admit_after_hits=settings.cache_admit_after_hits,
+    chunk_size=settings.cache_chunk_bytes,
+    ttl=settings.cache_ttl_seconds,
+    lock_timeout=settings.cache_fill_lock_seconds,
+)
@@ -12,6 +12,9 @@ from sheaf.config import settings
 from sheaf.models.document import Document
 from sheaf.models.user import User
 from sheaf.dependencies import get_user_storage
+from sheaf.services.blobs import acquire_blob
+from sheaf.services.search_cache import search_cache
+from sheaf.services.uploads import hash_bytes
 
 
 @dataclass
@@ -293,16 +296,19 @@ class CalibreService:
         filename = f"{doc_id}.pdf"
         original_name = f"{book.title}.pdf"
 
-        storage_path = await storage.save(filename, file_bytes)
+        upload = hash_bytes(storage, filename, file_bytes)
+        blob = await acquire_blob(db, storage, upload)
 
         doc = Document(
             id=doc_id,
-            filename=filename,
+            filename=Path(blob.storage_path).name,
             original_name=original_name,
             content_type="application/pdf",
-            size_bytes=len(file_bytes),
+            size_bytes=blob.size_bytes,
+            content_hash=blob.content_hash,
+            blob_id=blob.id,
             storage_backend=storage.__class__.__name__.lower().replace("storage", ""),
-            storage_path=storage_path,
+            storage_path=blob.storage_path,
             owner_id=user_id,
             calibre_id=calibre_id,
             calibre_metadata={
@@ -317,6 +323,7 @@ class CalibreService:
         db.add(doc)
         await db.commit()
         await db.refresh(doc)
+        await search_cache.bump(user_id)
 
         return doc
 
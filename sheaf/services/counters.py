@@ -0,0 +1,77 @@
+import asyncio
+import logging
+
+from sqlalchemy import bindparam, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from sheaf.models.document import Document
+from sheaf.schemas.document import DocumentRead
+
+logger = logging.getLogger(__name__)
+
+
+class DownloadCounter:
+    """Write-behind buffer for `documents.download_count`.
+
+    Downloads only bump an in-process counter; a periodic flusher applies the
+    accumulated deltas in one batched UPDATE, so the read path never takes a
+    row lock. Responses merge the pending delta of this process (`merge`) —
+    deltas buffered by other workers become visible after their next flush.
+    Deltas stay pending until the UPDATE is committed, so reads never miss
+    them mid-flush and a failed flush loses nothing.
+    """
+
+    def __init__(self) -> None:
+        self._pending: dict[str, int] = {}
+
+    def incr(self, doc_id: str, n: int = 1) -> None:
+        self._pending[doc_id] = self._pending.get(doc_id, 0) + n
+
+    def pending(self, doc_id: str) -> int:
+        return self._pending.get(doc_id, 0)
+
+    def pending_total(self) -> int:
+        return sum(self._pending.values())
+
+    def discard(self, doc_id: str) -> None:
+        self._pending.pop(doc_id, None)
+
+    def merge(self, item: DocumentRead) -> DocumentRead:
+        """Add this process's pending downloads to a response's `download_count`."""
+        item.download_count += self.pending(item.id)
+        return item
+
+    async def flush(self, session_factory: async_sessionmaker[AsyncSession]) -> int:
+        """Apply buffered increments; returns the number of documents updated."""
+        batch = dict(self._pending)
+        if not batch:
+            return 0
+        table = Document.__table__
+        stmt = (
+            update(table)
+            .where(table.c.id == bindparam("b_id"))
+            .values(download_count=table.c.download_count + bindparam("b_n"))
+        )
+        async with session_factory() as db:
+            await db.execute(stmt, [{"b_id": k, "b_n": v} for k, v in batch.items()])
+            await db.commit()
+        # Keep whatever was counted while the commit was in flight.
+        for doc_id, n in batch.items():
+            left = self._pending.get(doc_id, 0) - n
+            if left > 0:
+                self._pending[doc_id] = left
+            else:
+                self._pending.pop(doc_id, None)
+        return len(batch)
+
+    async def run(self, session_factory: async_sessionmaker[AsyncSession], interval: float) -> None:
+        """Flush forever every `interval` seconds (cancel to stop)."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.flush(session_factory)
+            except Exception:
+                logger.exception("Failed to flush download counters")
+
+
+download_counter = DownloadCounter()
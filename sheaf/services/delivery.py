@@ -0,0 +1,208 @@
+"""PDF delivery with HTTP Range and conditional GET support.
+
+Locally stored documents are handed to `FileResponse`, which streams straight
+from disk (and uses the server's `pathsend` extension where available). For
+remote backends, documents admitted by the document cache are served from
+cached chunks (filled lazily from storage); everything else is streamed from
+the storage backend so a worker never holds a whole scanned book in memory.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import formatdate, parsedate_to_datetime
+
+from fastapi import HTTPException, Request, status
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from sheaf.dependencies import get_document_storage
+from sheaf.models.blob import Blob
+from sheaf.models.document import Document
+from sheaf.services.cache import document_cache
+
+
+@dataclass
+class DeliverySource:
+    """The stored file a response is built from (the original or its variant)."""
+
+    path: str
+    size: int
+    etag: str
+    cache_key: str
+
+
+def document_etag(doc: Document, variant: str = "") -> str:
+    """Strong validator for a stored document (documents are immutable)."""
+    suffix = f"-{variant}" if variant else ""
+    return f'"{doc.id}-{doc.size_bytes:x}{suffix}"'
+
+
+async def resolve_source(
+    doc: Document,
+    db: AsyncSession,
+    prefer_linearized: bool = False,
+) -> DeliverySource:
+    """Pick the linearized variant when asked for and available."""
+    if prefer_linearized and doc.linearize_status == "completed" and doc.blob_id:
+        blob = await db.get(Blob, doc.blob_id)
+        if blob is not None and blob.linearized_path and blob.linearized_size is not None:
+            return DeliverySource(
+                path=blob.linearized_path,
+                size=blob.linearized_size,
+                etag=document_etag(doc, "lin"),
+                cache_key=f"pdf:{doc.id}:lin",
+            )
+    return DeliverySource(
+        path=doc.storage_path,
+        size=doc.size_bytes,
+        etag=document_etag(doc),
+        cache_key=f"pdf:{doc.id}",
+    )
+
+
+def document_last_modified(doc: Document) -> datetime:
+    """Upload time as an aware UTC datetime (the DB stores naive UTC)."""
+    created = doc.created_at
+    if created.tzinfo is None:
+        created = created.replace(tzinfo=timezone.utc)
+    return created.replace(microsecond=0)
+
+
+def is_not_modified(request: Request, etag: str, last_modified: datetime) -> bool:
+    """Evaluate If-None-Match / If-Modified-Since (RFC 9110 section 13.2.2)."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return last_modified <= since
+    return False
+
+
+def parse_range(header: str | None, size: int) -> tuple[int, int] | None:
+    """Parse a single-range `Range` header into a half-open `(start, end)` pair.
+
+    Returns None when the whole representation should be sent (no header,
+    a syntax we don't handle, or multiple ranges). Raises 416 when the range
+    lies entirely past the end of the file.
+    """
+    if not header:
+        return None
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, sep, last = spec.strip().partition("-")
+    if not sep:
+        return None
+    try:
+        if first:
+            start = int(first)
+            end = int(last) + 1 if last else size
+            if start < size and end <= start:
+                return None
+        else:
+            suffix = int(last)
+            if suffix == 0:
+                raise _range_not_satisfiable(size)
+            start = max(size - suffix, 0)
+            end = size
+    except ValueError:
+        return None
+    if start >= size:
+        raise _range_not_satisfiable(size)
+    return start, min(end, size)
+
+
+def _range_not_satisfiable(size: int) -> HTTPException:
+    return HTTPException(
+        status_code=416,
+        detail="Requested range not satisfiable",
+        headers={"Content-Range": f"bytes */{size}"},
+    )
+
+
+def opens_document(response: Response) -> bool:
+    """Whether a delivery counts as a download: a full response or its first range.
+
+    Viewers fetch one document as many ranges and revalidate it with 304s;
+    only the response that starts the document is counted.
+    """
+    if response.status_code == status.HTTP_200_OK:
+        return True
+    return response.status_code == status.HTTP_206_PARTIAL_CONTENT and response.headers[
+        "content-range"
+    ].startswith("bytes 0-")
+
+
+def _requested_range(request: Request, size: int, etag: str) -> tuple[int, int] | None:
+    if_range = request.headers.get("if-range")
+    if if_range is not None and if_range.strip() != etag:
+        return None
+    return parse_range(request.headers.get("range"), size)
+
+
+async def serve_document(
+    request: Request,
+    doc: Document,
+    db: AsyncSession,
+    disposition: str = "inline",
+    prefer_linearized: bool = False,
+) -> Response:
+    """Build a full (200), partial (206) or not-modified (304) response."""
+    source = await resolve_source(doc, db, prefer_linearized)
+    size = source.size
+    etag = source.etag
+    last_modified = document_last_modified(doc)
+    validators = {
+        "ETag": etag,
+        "Last-Modified": formatdate(last_modified.timestamp(), usegmt=True),
+        "Cache-Control": "private, no-cache",
+    }
+    if is_not_modified(request, etag, last_modified):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=validators)
+
+    byte_range = _requested_range(request, size, etag)
+    start, end = byte_range or (0, size)
+
+    headers = {
+        "Content-Disposition": f'{disposition}; filename="{doc.original_name}"',
+        "Accept-Ranges": "bytes",
+        **validators,
+    }
+
+    if doc.storage_backend == "local" and byte_range is None:
+        return FileResponse(source.path, media_type="application/pdf", headers=headers)
+
+    status_code = status.HTTP_200_OK
+    if byte_range is not None:
+        status_code = status.HTTP_206_PARTIAL_CONTENT
+        headers["Content-Range"] = f"bytes {start}-{end - 1}/{size}"
+
+    storage = await get_document_storage(doc, db)
+    headers["Content-Length"] = str(end - start)
+
+    if doc.storage_backend != "local" and document_cache.should_admit(
+        source.cache_key, size, start
+    ):
+
+        async def load_chunk(offset: int, length: int) -> bytes:
+            return await storage.load_range(source.path, offset, length)
+
+        body = document_cache.iter_range(source.cache_key, size, start, end, load_chunk)
+    else:
+        body = storage.iter_chunks(source.path, offset=start, length=end - start)
+
+    return StreamingResponse(
+        body,
+        status_code=status_code,
+        media_type="application/pdf",
+        headers=headers,
+    )
@@ -0,0 +1,98 @@
+import os
+import threading
+import uuid
+from pathlib import Path
+
+
+class DiskCache:
+    """Size-bounded directory of files keyed by hex digest.
+
+    Files live at `{root}/{key[:2]}/{key}{suffix}` and are published with an
+    atomic rename, so readers never see partial writes. When the total size
+    exceeds `max_bytes` the least recently used files (by mtime, refreshed on
+    every hit) are removed. Safe to use from worker threads.
+
+    Several processes writing to one directory would each count only their
+    own files against the budget; give them `max_bytes=None` (never evict on
+    write) and have a single process `trim()` the directory instead.
+    """
+
+    def __init__(self, root: str | Path, max_bytes: int | None) -> None:
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total: int | None = None
+
+    def path_for(self, key: str, suffix: str = "") -> Path:
+        return self.root / key[:2] / f"{key}{suffix}"
+
+    def get(self, key: str, suffix: str = "") -> Path | None:
+        path = self.path_for(key, suffix)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def temp_path(self, key: str, suffix: str = "") -> Path:
+        """A private path to write to before `commit`."""
+        final = self.path_for(key, suffix)
+        final.parent.mkdir(parents=True, exist_ok=True)
+        return final.with_name(f".{final.name}.{uuid.uuid4().hex}.part")
+
+    def commit(self, key: str, temp: Path, suffix: str = "") -> Path:
+        final = self.path_for(key, suffix)
+        size = temp.stat().st_size
+        os.replace(temp, final)
+        if self.max_bytes is None:
+            return final
+        with self._lock:
+            self._ensure_total()
+            self._total += size
+            if self._total > self.max_bytes:
+                self._evict()
+        return final
+
+    def put_bytes(self, key: str, data: bytes, suffix: str = "") -> Path:
+        temp = self.temp_path(key, suffix)
+        temp.write_bytes(data)
+        return self.commit(key, temp, suffix)
+
+    def trim(self) -> None:
+        """Evict down to the budget, counting files written by any process."""
+        with self._lock:
+            self._total = sum(size for _, size, _ in self._files())
+            if self._total > self.max_bytes:
+                self._evict()
+
+    def _files(self) -> list[tuple[float, int, Path]]:
+        entries = []
+        if not self.root.exists():
+            return entries
+        for path in self.root.glob("*/*"):
+            if path.name.startswith("."):
+                continue
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def _ensure_total(self) -> None:
+        if self._total is None:
+            self._total = sum(size for _, size, _ in self._files())
+
+    def _evict(self) -> None:
+        # Trim to 90% of the budget so eviction scans stay infrequent.
+        target = int(self.max_bytes * 0.9)
+        entries = sorted(self._files())
+        self._total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if self._total <= target:
+                break
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                continue
+            self._total -= size
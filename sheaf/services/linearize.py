@@ -0,0 +1,119 @@
+"""Produce linearized ("fast web view") variants of stored PDFs with qpdf.
+
+A linearized PDF puts everything needed for the first page at the front of
+the file, so with range requests the reader can render page 1 before the
+rest has arrived. The variant belongs to the blob, so documents sharing
+bytes share it as well.
+"""
+
+import asyncio
+import logging
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import aiofiles
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from sheaf.config import settings
+from sheaf.dependencies import get_document_storage
+from sheaf.models.blob import Blob
+from sheaf.models.document import Document
+from sheaf.services.storage import StorageBackend
+
+logger = logging.getLogger(__name__)
+
+# qpdf exit codes: 0 = ok, 3 = ok with warnings, 2 = errors
+_QPDF_OK = (0, 3)
+
+
+class LinearizeError(Exception):
+    pass
+
+
+async def _run_qpdf(*args: str, check: bool = True) -> int:
+    proc = await asyncio.create_subprocess_exec(
+        settings.qpdf_path,
+        *args,
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    try:
+        _, stderr = await asyncio.wait_for(proc.communicate(), timeout=settings.linearize_timeout)
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        raise LinearizeError("qpdf timed out")
+    if check and proc.returncode not in _QPDF_OK:
+        raise LinearizeError(stderr.decode(errors="replace").strip()[:400] or "qpdf failed")
+    return proc.returncode
+
+
+async def _linearize_blob(blob: Blob, storage: StorageBackend) -> None:
+    with TemporaryDirectory() as tmpdir:
+        source = await storage.local_copy(blob.storage_path, tmpdir)
+        if await _run_qpdf("--is-linearized", source, check=False) == 0:
+            blob.linearized_path = blob.storage_path
+            blob.linearized_size = blob.size_bytes
+            return
+
+        output = Path(tmpdir) / "linearized.pdf"
+        await _run_qpdf("--linearize", source, str(output))
+
+        staged = await storage.begin_upload(f"{Path(blob.storage_path).stem}.linear.pdf")
+        try:
+            async with aiofiles.open(output, "rb") as f:
+                while chunk := await f.read(1024 * 1024):
+                    await staged.write(chunk)
+            blob.linearized_path = await staged.commit()
+        except BaseException:
+            await staged.abort()
+            raise
+        blob.linearized_size = output.stat().st_size
+
+
+async def linearize_document(doc_id: str, db: AsyncSession) -> Document:
+    """Make sure the document's blob has a linearized variant."""
+    doc = await db.get(Document, doc_id)
+    if doc is None:
+        raise ValueError("Document not found")
+    if doc.blob_id is None:
+        raise ValueError("Document is not content-addressed yet; run `sheaf dedupe` first")
+
+    blob = await db.get(Blob, doc.blob_id)
+    if blob.linearized_path is None:
+        doc.linearize_status = "processing"
+        await db.commit()
+        try:
+            storage = await get_document_storage(doc, db)
+            await _linearize_blob(blob, storage)
+        except Exception:
+            doc.linearize_status = "failed"
+            await db.commit()
+            raise
+
+    await db.execute(
+        update(Document).where(Document.blob_id == blob.id).values(linearize_status="completed")
+    )
+    await db.commit()
+    await db.refresh(doc)
+    return doc
+
+
+async def run_linearize_background(doc_id: str) -> None:
+    """Background task wrapper with its own session."""
+    from sheaf.database import async_session
+
+    async with async_session() as db:
+        try:
+            await linearize_document(doc_id, db)
+        except Exception:
+            logger.exception("Linearization failed for document %s", doc_id)
+
+
+async def pending_document_ids(db: AsyncSession, include_failed: bool = False) -> list[str]:
+    statuses = ["none", "pending"] + (["failed"] if include_failed else [])
+    result = await db.execute(
+        select(Document.id).where(Document.linearize_status.in_(statuses)).order_by(Document.id)
+    )
+    return list(result.scalars().all())
@@ -1,51 +1,438 @@
 import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from collections.abc import Awaitable, Callable
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
 from datetime import datetime
+from pathlib import Path
 from tempfile import TemporaryDirectory
 
-from pdf2image import convert_from_bytes
-import pytesseract
-from sqlalchemy import select
+from pdf2image import convert_from_path, pdfinfo_from_path
+from pdf2image.exceptions import PDFPopplerTimeoutError
+from sqlalchemy import delete, or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from sheaf.config import settings
 from sheaf.models.document import Document
+from sheaf.models.document_page import DocumentPage
 from sheaf.dependencies import get_document_storage
+from sheaf.services.ocr_cache import (
+    OCR_DPI,
+    checkpoint_key,
+    engine_signature,
+    load_result,
+    page_cache,
+    page_key,
+    result_key,
+    save_result,
+    trim_page_cache,
+)
+from sheaf.services.ocr_engine import PageTimeout, check_cancelled, get_engine
+from sheaf.services.ocr_events import ocr_events
+from sheaf.services.search_cache import search_cache
+
+logger = logging.getLogger(__name__)
+
+PAGE_BREAK = "\n\n--- Page Break ---\n\n"
+OCR_MODES = ("auto", "text-only", "ocr-only")
+# How long a cancelled job waits for its running pages to notice and stop.
+CANCEL_GRACE_SECONDS = 10.0
+
+# Characters expected in real text besides letters, digits and whitespace.
+_TEXT_PUNCTUATION = set(".,;:!?'\"()[]{}-–—/\\&%$€£@#*+=<>_|~`^°§…„”“‘’«»")
+
+
+@dataclass
+class PageText:
+    page_no: int
+    text: str
+    method: str  # "text" (embedded text layer) | "ocr" | "timeout" (gave up, no text)
+
+
+ProgressCallback = Callable[[int, int], Awaitable[None]]
+PagesCallback = Callable[[list[PageText]], Awaitable[None]]
+
+
+def is_usable_text(text: str) -> bool:
+    """Heuristic: does an embedded text layer look like real text?
+
+    Rejects pages that are (nearly) empty, typical of scans, and pages whose
+    layer is mostly symbols or replacement characters, typical of fonts
+    without a usable Unicode mapping.
+    """
+    chars = "".join(text.split())
+    if len(chars) < settings.ocr_min_text_chars:
+        return False
+    good = sum(1 for c in chars if c.isalnum() or c in _TEXT_PUNCTUATION)
+    return good / len(chars) >= 0.9
+
+
+def text_layer_timeout(pages: int) -> float:
+    """Seconds pdftotext may take to read the text of `pages` pages."""
+    return settings.ocr_page_timeout + settings.ocr_text_layer_timeout_per_page * pages
+
+
+async def read_text_layer(pdf_path: str, pages: int) -> list[str] | None:
+    """Embedded text of every page via pdftotext, or None if it can't be read."""
+    timeout = text_layer_timeout(pages)
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            "pdftotext",
+            "-enc",
+            "UTF-8",
+            pdf_path,
+            "-",
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+    except FileNotFoundError:
+        logger.warning("pdftotext is not installed")
+        return None
+    try:
+        stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout)
+    except TimeoutError:
+        logger.warning("pdftotext timed out after %.0f s on %s", timeout, pdf_path)
+        return None
+    finally:
+        if proc.returncode is None:
+            proc.kill()
+            await proc.wait()
+    if proc.returncode != 0:
+        logger.warning("pdftotext failed: %s", stderr.decode(errors="replace").strip()[:200])
+        return None
+    # pdftotext ends every page with a form feed.
+    return stdout.decode("utf-8", errors="replace").split("\f")
+
+
+_pool: ProcessPoolExecutor | None = None
+_pool_signature: str | None = None
+_job_slots: asyncio.Semaphore | None = None
+
+
+def _ocr_worker_init() -> None:
+    # Tesseract's OpenMP threads would oversubscribe cores already used by
+    # sibling worker processes.
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+    # Load the engine (and its language models) once, before the first page.
+    get_engine()
+
+
+def ocr_worker_count() -> int:
+    return settings.ocr_workers or os.cpu_count() or 1
+
+
+def get_ocr_pool() -> ProcessPoolExecutor:
+    """Process pool dedicated to OCR, created on first use."""
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=ocr_worker_count(),
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_ocr_worker_init,
+        )
+    return _pool
+
+
+def discard_ocr_pool(pool: ProcessPoolExecutor) -> None:
+    """Drop a broken pool so that the next `get_ocr_pool()` starts fresh workers.
+
+    A pool whose worker died (OOM, a crash in the engine) is broken for good:
+    everything submitted to it fails with BrokenProcessPool.
+    """
+    global _pool
+    if _pool is pool:
+        _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown_ocr_pool() -> None:
+    global _pool, _pool_signature
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+    _pool_signature = None
+
+
+async def pool_engine_signature() -> str:
+    """`engine_signature()` of the OCR pool's workers, asked of a worker once.
+
+    The workers, not this process, decide which engine really runs.
+    """
+    global _pool_signature
+    if _pool_signature is None:
+        loop = asyncio.get_running_loop()
+        _pool_signature = await loop.run_in_executor(get_ocr_pool(), engine_signature)
+    return _pool_signature
+
+
+def _get_job_slots() -> asyncio.Semaphore:
+    global _job_slots
+    if _job_slots is None:
+        _job_slots = asyncio.Semaphore(settings.ocr_max_concurrent_jobs)
+    return _job_slots
+
+
+class OCRTimeout(Exception):
+    pass
+
+
+def format_pages(page_nos: list[int], limit: int = 10) -> str:
+    shown = ", ".join(str(n) for n in page_nos[:limit])
+    return shown if len(page_nos) <= limit else f"{shown} and {len(page_nos) - limit} more"
+
+
+def job_deadline(pages: int) -> float | None:
+    """Seconds a job may take to extract `pages` pages, once it has a slot."""
+    seconds = settings.ocr_timeout + settings.ocr_timeout_per_page * pages
+    return seconds or None
+
+
+def _ocr_page(pdf_path: str, page: int, language: str, cancel_token: str | None = None) -> str:
+    """Render and recognize a single page (runs in a worker process).
+
+    Only this page is rasterized, straight into memory, so a worker's memory
+    use does not depend on the length of the document. Rendering and
+    recognition each get `ocr_page_timeout` seconds, and stop early once
+    `cancel_token` exists.
+    """
+    check_cancelled(cancel_token)
+    try:
+        images = convert_from_path(
+            pdf_path,
+            dpi=OCR_DPI,
+            first_page=page,
+            last_page=page,
+            grayscale=True,
+            timeout=settings.ocr_page_timeout,
+        )
+    except PDFPopplerTimeoutError as exc:
+        raise PageTimeout(f"Rendering page {page} timed out") from exc
+    try:
+        return "".join(_recognize(img, language, cancel_token) for img in images)
+    finally:
+        for img in images:
+            img.close()
+
+
+def _recognize(image, language: str, cancel_token: str | None = None) -> str:
+    """OCR one page image, going through the per-page cache if enabled."""
+    cache = page_cache()
+    if cache is None:
+        return get_engine().recognize(image, language, cancel_token)
+    key = page_key(image.tobytes(), language)
+    cached = cache.get(key, ".txt")
+    if cached is not None:
+        return cached.read_text(encoding="utf-8")
+    text = get_engine().recognize(image, language, cancel_token)
+    cache.put_bytes(key, text.encode("utf-8"), ".txt")
+    return text
 
 
 class OCRService:
     def __init__(self, language: str = "eng"):
         self.language = language
 
-    async def extract_text_from_pdf(self, pdf_bytes: bytes) -> str:
-        """Extract text from PDF using OCR."""
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, self._extract_sync, pdf_bytes)
+    async def extract_text_from_path(
+        self,
+        pdf_path: str,
+        on_progress: ProgressCallback | None = None,
+        mode: str = "auto",
+    ) -> str:
+        pages = await self.extract_pages(pdf_path, on_progress, mode)
+        return PAGE_BREAK.join(page.text for page in pages)
 
-    def _extract_sync(self, pdf_bytes: bytes) -> str:
-        """Synchronous OCR extraction (runs in thread pool)."""
-        with TemporaryDirectory() as tmpdir:
-            images = convert_from_bytes(
-                pdf_bytes,
-                dpi=300,
-                output_folder=tmpdir,
-                fmt="png",
-                thread_count=2,
-            )
+    async def extract_pages(
+        self,
+        pdf_path: str,
+        on_progress: ProgressCallback | None = None,
+        mode: str = "auto",
+        done_pages: dict[int, PageText] | None = None,
+        on_pages: PagesCallback | None = None,
+    ) -> list[PageText]:
+        """Extract every page of a PDF on disk.
+
+        In `auto` mode pages with a usable embedded text layer take it as
+        is and only the rest are OCR'd; `text-only` never OCRs and
+        `ocr-only` ignores the text layer. OCR runs one page per task on the
+        process pool, with at most `ocr_inflight_pages` pages of a document
+        queued or running and at most `ocr_max_concurrent_jobs` documents
+        in progress.
+
+        The job's deadline (see `job_deadline`) starts once it has a slot,
+        so time spent waiting behind other documents doesn't count.
+
+        Pages in `done_pages` (a checkpoint of an earlier attempt) are not
+        extracted again. Newly extracted pages are passed to `on_pages` as
+        soon as they are ready, and `on_progress(done, total)` is awaited
+        as pages finish.
+        """
+        if mode not in OCR_MODES:
+            raise ValueError(f"Unknown OCR mode: {mode}")
+        loop = asyncio.get_running_loop()
+        async with _get_job_slots():
+            info = await loop.run_in_executor(None, pdfinfo_from_path, pdf_path)
+            total = int(info["Pages"])
+            # The deadline starts once the job has a slot and scales with its size.
+            limit = job_deadline(total - len(done_pages or {}))
+            deadline = asyncio.timeout(limit)
+            try:
+                async with deadline:
+                    return await self._extract(
+                        pdf_path, total, on_progress, mode, done_pages, on_pages
+                    )
+            except TimeoutError:
+                if deadline.expired():
+                    raise OCRTimeout(f"OCR did not finish within {limit:.0f} seconds")
+                raise
+
+    async def _extract(
+        self,
+        pdf_path: str,
+        total: int,
+        on_progress: ProgressCallback | None,
+        mode: str,
+        done_pages: dict[int, PageText] | None,
+        on_pages: PagesCallback | None,
+    ) -> list[PageText]:
+        pages: list[PageText | None] = [None] * total
+        for page_no, page in (done_pages or {}).items():
+            if page_no <= total:
+                pages[page_no - 1] = page
+
+        if mode != "ocr-only" and None in pages:
+            layer = await read_text_layer(pdf_path, total)
+            if layer is None and mode == "text-only":
+                raise RuntimeError("Could not read the PDF text layer")
+            if layer is None:
+                missing = sum(page is None for page in pages)
+                logger.warning("No text layer read from %s; OCRing all %d pages", pdf_path, missing)
+            layer = (layer or [])[:total]
+            if mode == "text-only":
+                layer += [""] * (total - len(layer))
+            found = [
+                PageText(page_no, text, "text")
+                for page_no, text in enumerate(layer, start=1)
+                if pages[page_no - 1] is None and (mode == "text-only" or is_usable_text(text))
+            ]
+            for page in found:
+                pages[page.page_no - 1] = page
+            if found and on_pages is not None:
+                await on_pages(found)
 
-            texts = []
-            for img in images:
-                text = pytesseract.image_to_string(img, lang=self.language)
-                texts.append(text)
-                img.close()
+        todo = [n for n, page in enumerate(pages, start=1) if page is None]
+        if on_progress is not None:
+            await on_progress(total - len(todo), total)
 
-            return "\n\n--- Page Break ---\n\n".join(texts)
+        if todo:
+            try:
+                with TemporaryDirectory() as control:
+                    cancel_token = os.path.join(control, "cancel")
+                    try:
+                        await self._ocr_pages(
+                            pdf_path, todo, pages, cancel_token, on_progress, on_pages
+                        )
+                    except BrokenProcessPool:
+                        # A worker died and took the pool with it; give the pages
+                        # still missing one more go on a fresh pool.
+                        logger.warning("OCR pool broke while processing %s; retrying", pdf_path)
+                        todo = [n for n, page in enumerate(pages, start=1) if page is None]
+                        await self._ocr_pages(
+                            pdf_path, todo, pages, cancel_token, on_progress, on_pages
+                        )
+            finally:
+                # The workers only add to the page cache; evict here, after each job.
+                await asyncio.get_running_loop().run_in_executor(None, trim_page_cache)
+        return pages
+
+    async def _ocr_pages(
+        self,
+        pdf_path: str,
+        todo: list[int],
+        pages: list[PageText | None],
+        cancel_token: str,
+        on_progress: ProgressCallback | None,
+        on_pages: PagesCallback | None,
+    ) -> None:
+        """OCR the `todo` pages into `pages` through a bounded window of pool tasks.
+
+        If this coroutine is cancelled or fails, `cancel_token` is created so
+        that running tasks kill their tesseract/poppler processes, and the
+        in-flight tasks are drained before returning, freeing the pool. A
+        broken pool is discarded before BrokenProcessPool is raised.
+        """
+        loop = asyncio.get_running_loop()
+        pool = get_ocr_pool()
+        window = settings.ocr_inflight_pages or ocr_worker_count()
+        total = len(pages)
+        done = total - len(todo)
+        queue = iter(todo)
+        inflight: dict[asyncio.Future, int] = {}
+        try:
+            while True:
+                for page_no in queue:
+                    future = loop.run_in_executor(
+                        pool, _ocr_page, pdf_path, page_no, self.language, cancel_token
+                    )
+                    inflight[future] = page_no
+                    if len(inflight) >= window:
+                        break
+                if not inflight:
+                    break
+                finished, _ = await asyncio.wait(inflight, return_when=asyncio.FIRST_COMPLETED)
+                batch = []
+                for future in finished:
+                    page_no = inflight.pop(future)
+                    try:
+                        page = PageText(page_no, future.result(), "ocr")
+                    except PageTimeout:
+                        logger.warning("OCR of page %d of %s timed out", page_no, pdf_path)
+                        page = PageText(page_no, "", "timeout")
+                    pages[page_no - 1] = page
+                    batch.append(page)
+                    done += 1
+                if on_pages is not None:
+                    await on_pages(batch)
+                if on_progress is not None:
+                    await on_progress(done, total)
+        except BrokenProcessPool:
+            # The pool already killed its workers and failed every pending task.
+            discard_ocr_pool(pool)
+            raise
+        except BaseException:
+            await asyncio.to_thread(Path(cancel_token).touch)
+            if inflight:
+                finished, _ = await asyncio.wait(inflight, timeout=CANCEL_GRACE_SECONDS)
+                for future in finished:
+                    if not future.cancelled():
+                        future.exception()  # already handled by the raise below
+            raise
+        finally:
+            for future in inflight:
+                future.cancel()
 
     async def process_document(
         self,
         doc_id: str,
         db: AsyncSession,
         user_id: str,
+        mode: str = "auto",
+        job_id: str | None = None,
     ) -> Document:
-        """Run OCR on a document and save extracted text."""
+        """Extract a document's text and save it, along with per-page results.
+
+        Pages are stored as they complete, tagged with the settings they
+        were extracted with (language, mode, engine); any later run with
+        the same settings (a queue retry, a restart after a crash or a
+        manual retry) resumes from the pages that are still missing. Pages
+        that timed out fail the run with OCRTimeout, after saving the text
+        of the others. When run by the queue (`job_id` set), a failure
+        leaves the document's status to the queue, which knows whether the
+        job will be retried.
+        """
         result = await db.execute(
             select(Document).where(Document.id == doc_id, Document.owner_id == user_id)
         )
@@ -53,29 +440,166 @@ class OCRService:
         if not doc:
             raise ValueError("Document not found")
 
+        run_key = checkpoint_key(self.language, mode, await pool_engine_signature())
+        done_pages = await self._load_checkpoint(db, doc.id, run_key)
         doc.ocr_status = "processing"
         doc.ocr_error = None
+        doc.ocr_pages_done = len(done_pages)
+        doc.ocr_pages_total = None
         await db.commit()
+        await ocr_events.publish(user_id, doc.id, "processing", len(done_pages))
 
-        try:
-            storage = await get_document_storage(doc, db)
-            pdf_bytes = await storage.load(doc.storage_path)
+        last_saved = 0.0
+
+        async def save_progress(done: int, total: int) -> None:
+            nonlocal last_saved
+            now = time.monotonic()
+            if done in (0, total) or now - last_saved >= settings.ocr_progress_interval_seconds:
+                last_saved = now
+                doc.ocr_pages_done = done
+                doc.ocr_pages_total = total
+                await db.commit()
+                await ocr_events.publish(user_id, doc.id, "processing", done, total)
+
+        async def save_pages(pages: list[PageText]) -> None:
+            db.add_all(
+                DocumentPage(
+                    document_id=doc.id,
+                    page_no=page.page_no,
+                    method=page.method,
+                    text=page.text,
+                    job_id=job_id,
+                    run_key=run_key,
+                )
+                for page in pages
+            )
+            await db.commit()
 
-            extracted_text = await self.extract_text_from_pdf(pdf_bytes)
+        try:
+            pages = await self._extract_document(
+                doc, db, mode, save_progress, done_pages, save_pages
+            )
 
-            doc.extracted_text = extracted_text
+            texts = await db.execute(
+                select(DocumentPage.text)
+                .where(DocumentPage.document_id == doc.id)
+                .order_by(DocumentPage.page_no)
+            )
+            doc.extracted_text = PAGE_BREAK.join(texts.scalars().all())
+            timed_out = [p.page_no for p in pages if p.method == "timeout"]
+            if timed_out:
+                # Keep what was read, but a document with missing pages isn't done.
+                await db.commit()
+                raise OCRTimeout(f"OCR timed out on pages {format_pages(timed_out)}")
             doc.ocr_status = "completed"
             doc.text_extracted_at = datetime.utcnow()
             await db.commit()
             await db.refresh(doc)
+            await search_cache.bump(user_id)
+            await ocr_events.publish(
+                user_id, doc.id, "completed", doc.ocr_pages_done, doc.ocr_pages_total
+            )
 
             return doc
 
         except Exception as e:
+            if job_id is not None:
+                # The queue decides between a retry (pending) and failed; see fail_job.
+                raise
             doc.ocr_status = "failed"
             doc.ocr_error = str(e)[:500]
             await db.commit()
+            await ocr_events.publish(
+                user_id, doc.id, "failed", doc.ocr_pages_done, doc.ocr_pages_total, doc.ocr_error
+            )
             raise
 
+    async def _load_checkpoint(
+        self, db: AsyncSession, doc_id: str, run_key: str
+    ) -> dict[int, PageText]:
+        """Pages already extracted with the same settings; drops every other page."""
+        await db.execute(
+            delete(DocumentPage).where(
+                DocumentPage.document_id == doc_id,
+                or_(
+                    DocumentPage.run_key.is_(None),
+                    DocumentPage.run_key != run_key,
+                    DocumentPage.method == "timeout",  # give those pages another try
+                ),
+            )
+        )
+        result = await db.execute(select(DocumentPage).where(DocumentPage.document_id == doc_id))
+        return {
+            row.page_no: PageText(row.page_no, row.text, row.method)
+            for row in result.scalars().all()
+        }
+
+    async def _extract_document(
+        self,
+        doc: Document,
+        db: AsyncSession,
+        mode: str,
+        on_progress: ProgressCallback,
+        done_pages: dict[int, PageText],
+        on_pages: PagesCallback,
+    ) -> list[PageText]:
+        """Pages from the result cache when this exact PDF was done before."""
+        key = None
+        if doc.content_hash:
+            signature = await pool_engine_signature()
+            key = result_key(doc.content_hash, self.language, mode, signature)
+        if key is not None:
+            cached = await load_result(db, key)
+            if cached is not None:
+                pages = [
+                    PageText(page_no, text, method)
+                    for page_no, (text, method) in enumerate(cached, start=1)
+                ]
+                await on_pages([p for p in pages if p.page_no not in done_pages])
+                await on_progress(len(pages), len(pages))
+                return pages
+
+        storage = await get_document_storage(doc, db)
+        with TemporaryDirectory() as tmpdir:
+            pdf_path = await storage.local_copy(doc.storage_path, tmpdir)
+            pages = await self.extract_pages(pdf_path, on_progress, mode, done_pages, on_pages)
+        # Results with pages we gave up on stay uncached so a retry can fill them in.
+        if key is not None and all(p.method != "timeout" for p in pages):
+            await save_result(db, key, doc.content_hash, [(p.text, p.method) for p in pages])
+        return pages
+
+
+async def split_legacy_pages(db: AsyncSession, batch_size: int = 100) -> int:
+    """Create page rows for documents extracted before pages were stored.
+
+    Their text is split back into pages on PAGE_BREAK, so search can list
+    and highlight matching pages instead of the whole document. Returns the
+    number of documents split.
+    """
+    split = 0
+    last_id = ""
+    while True:
+        result = await db.execute(
+            select(Document.id, Document.extracted_text)
+            .where(
+                Document.id > last_id,
+                Document.extracted_text.is_not(None),
+                ~select(DocumentPage.id).where(DocumentPage.document_id == Document.id).exists(),
+            )
+            .order_by(Document.id)
+            .limit(batch_size)
+        )
+        rows = result.all()
+        if not rows:
+            return split
+        for doc_id, text in rows:
+            db.add_all(
+                DocumentPage(document_id=doc_id, page_no=page_no, method="legacy", text=page)
+                for page_no, page in enumerate(text.split(PAGE_BREAK), start=1)
+            )
+        await db.commit()
+        split += len(rows)
+        last_id = rows[-1][0]
+
 
 ocr_service = OCRService()
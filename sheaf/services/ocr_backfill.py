@@ -0,0 +1,141 @@
+"""Bulk OCR backfills: queue many documents as one throttled batch.
+
+A backfill enqueues a low-priority job for every matching document that has
+no OCR in flight. The queue only hands those jobs out inside the
+backfill's time window and below its hourly start cap (see
+`sheaf.services.ocr_queue.open_batch_ids`), so a backfill of thousands of
+documents trickles through instead of saturating the OCR workers.
+"""
+
+import uuid
+from datetime import datetime
+
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from sheaf.config import settings
+from sheaf.models.document import Document
+from sheaf.models.ocr_backfill import OCRBackfill
+from sheaf.models.ocr_job import OCRJob
+from sheaf.services.ocr_queue import ACTIVE_STATUSES, parse_window
+
+JOB_STATUSES = ("queued", "processing", "completed", "failed", "cancelled")
+_INSERT_BATCH = 500
+
+
+def _document_filter(filters: dict) -> list:
+    has_job = select(OCRJob.id).where(
+        OCRJob.document_id == Document.id, OCRJob.status.in_(ACTIVE_STATUSES)
+    )
+    conditions = [Document.ocr_status.in_(filters["ocr_status"]), ~has_job.exists()]
+    if filters.get("owner_id"):
+        conditions.append(Document.owner_id == filters["owner_id"])
+    if filters.get("min_size_bytes") is not None:
+        conditions.append(Document.size_bytes >= filters["min_size_bytes"])
+    if filters.get("max_size_bytes") is not None:
+        conditions.append(Document.size_bytes <= filters["max_size_bytes"])
+    return conditions
+
+
+async def create_backfill(
+    db: AsyncSession,
+    created_by: str,
+    filters: dict,
+    mode: str = "auto",
+    max_per_hour: int | None = None,
+    window: str | None = None,
+    priority: int | None = None,
+) -> OCRBackfill:
+    """Queue OCR for every document matching `filters` and commit.
+
+    `filters` may hold `owner_id`, `ocr_status` (list, default ["none"]),
+    `min_size_bytes` and `max_size_bytes`. Unset throttling options fall
+    back to the `ocr_backfill_*` settings.
+    """
+    filters = {"ocr_status": ["none"], **{k: v for k, v in filters.items() if v is not None}}
+    window = settings.ocr_backfill_window if window is None else window
+    parse_window(window)  # raises ValueError if malformed
+
+    backfill = OCRBackfill(
+        created_by=created_by,
+        filters=filters,
+        mode=mode,
+        priority=settings.ocr_backfill_priority if priority is None else priority,
+        max_per_hour=settings.ocr_backfill_max_per_hour if max_per_hour is None else max_per_hour,
+        window=window,
+    )
+    db.add(backfill)
+    await db.flush()
+
+    conditions = _document_filter(filters)
+    total = 0
+    last_id = ""
+    while True:
+        result = await db.execute(
+            select(Document.id, Document.owner_id)
+            .where(*conditions, Document.id > last_id)
+            .order_by(Document.id)
+            .limit(_INSERT_BATCH)
+        )
+        rows = result.all()
+        if not rows:
+            break
+        now = datetime.utcnow()
+        await db.execute(
+            insert(OCRJob),
+            [
+                {
+                    "id": str(uuid.uuid4()),
+                    "document_id": doc_id,
+                    "user_id": owner_id,
+                    "language": settings.ocr_language,
+                    "mode": mode,
+                    "status": "queued",
+                    "priority": backfill.priority,
+                    "batch_id": backfill.id,
+                    "attempts": 0,
+                    "max_attempts": settings.ocr_max_attempts,
+                    "run_after": now,
+                }
+                for doc_id, owner_id in rows
+            ],
+        )
+        await db.execute(
+            update(Document)
+            .where(Document.id.in_([doc_id for doc_id, _ in rows]))
+            .values(ocr_status="pending", ocr_error=None)
+        )
+        total += len(rows)
+        last_id = rows[-1][0]
+
+    backfill.total_jobs = total
+    await db.commit()
+    return backfill
+
+
+async def backfill_progress(db: AsyncSession, backfill_id: str) -> dict[str, int]:
+    """Job counts by status for one backfill."""
+    result = await db.execute(
+        select(OCRJob.status, func.count(OCRJob.id))
+        .where(OCRJob.batch_id == backfill_id)
+        .group_by(OCRJob.status)
+    )
+    counts = dict.fromkeys(JOB_STATUSES, 0)
+    counts.update({status: n for status, n in result.all()})
+    return counts
+
+
+async def cancel_backfill(db: AsyncSession, backfill: OCRBackfill) -> int:
+    """Stop a backfill: queued jobs are cancelled, running ones finish. Commits."""
+    backfill.status = "cancelled"
+    queued = select(OCRJob.document_id).where(
+        OCRJob.batch_id == backfill.id, OCRJob.status == "queued"
+    )
+    await db.execute(update(Document).where(Document.id.in_(queued)).values(ocr_status="cancelled"))
+    result = await db.execute(
+        update(OCRJob)
+        .where(OCRJob.batch_id == backfill.id, OCRJob.status == "queued")
+        .values(status="cancelled", finished_at=datetime.utcnow())
+    )
+    await db.commit()
+    return result.rowcount
@@ -0,0 +1,118 @@
+"""Caches for extracted text, so identical PDFs and pages are OCR'd once.
+
+Whole documents are cached in the `ocr_results` table under a key built
+from the PDF's SHA-256, the OCR language, the extraction mode and the
+engine settings, so any user uploading the same file gets the stored pages.
+Individual OCR'd pages can additionally be cached on disk keyed by the
+rendered page image, which helps files that only share some pages.
+"""
+
+import hashlib
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from sheaf.config import settings
+from sheaf.models.ocr_result import OCRResult
+from sheaf.services.diskcache import DiskCache
+from sheaf.services.ocr_engine import get_engine
+
+logger = logging.getLogger(__name__)
+
+OCR_DPI = 300
+
+_page_cache: DiskCache | None = None
+
+
+def engine_signature() -> str:
+    """Identifies the OCR engine this process runs and the rendering settings.
+
+    Built from the engine instance actually created (after any fallback from
+    tesserocr to the CLI), so call it where OCR runs: in a pool worker.
+    """
+    return f"{get_engine().signature}:dpi{OCR_DPI}:gray"
+
+
+def checkpoint_key(language: str, mode: str, signature: str) -> str:
+    """Identifies the settings a document's stored pages were extracted with.
+
+    Pages stored under the same key can be reused by any later run of the
+    document, whichever job wrote them.
+    """
+    raw = ":".join([language, mode, str(settings.ocr_min_text_chars), signature])
+    return hashlib.sha256(raw.encode()).hexdigest()[:32]
+
+
+def result_key(content_hash: str, language: str, mode: str, signature: str) -> str:
+    raw = ":".join([content_hash, language, mode, str(settings.ocr_min_text_chars), signature])
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+async def load_result(db: AsyncSession, key: str) -> list[tuple[str, str]] | None:
+    """Cached `(text, method)` pages for `key`, or None on a miss."""
+    result = await db.execute(select(OCRResult).where(OCRResult.cache_key == key))
+    entry = result.scalar_one_or_none()
+    if entry is None:
+        return None
+    await db.execute(
+        update(OCRResult)
+        .where(OCRResult.id == entry.id)
+        .values(hit_count=OCRResult.hit_count + 1, last_used_at=datetime.utcnow())
+    )
+    return [(text, method) for text, method in entry.pages]
+
+
+async def save_result(
+    db: AsyncSession, key: str, content_hash: str, pages: list[tuple[str, str]]
+) -> None:
+    """Store extracted pages; a concurrent store of the same key wins silently."""
+    try:
+        async with db.begin_nested():
+            db.add(
+                OCRResult(
+                    cache_key=key,
+                    content_hash=content_hash,
+                    page_count=len(pages),
+                    pages=[list(page) for page in pages],
+                )
+            )
+    except IntegrityError:
+        pass
+
+
+async def prune_results(db: AsyncSession) -> int:
+    """Drop results unused for `ocr_cache_retention_days`; returns rows removed."""
+    cutoff = datetime.utcnow() - timedelta(days=settings.ocr_cache_retention_days)
+    result = await db.execute(delete(OCRResult).where(OCRResult.last_used_at < cutoff))
+    await db.commit()
+    return result.rowcount
+
+
+def page_cache() -> DiskCache | None:
+    """The per-page OCR cache as OCR workers use it, or None if disabled.
+
+    Every worker process writes to the same directory, so none of them
+    evicts on its own; `trim_page_cache` enforces the budget from the
+    parent process, which sees what all of them wrote.
+    """
+    global _page_cache
+    if not settings.ocr_page_cache_enabled:
+        return None
+    if _page_cache is None:
+        _page_cache = DiskCache(settings.ocr_page_cache_path, max_bytes=None)
+    return _page_cache
+
+
+def trim_page_cache() -> None:
+    """Evict OCR'd pages past `ocr_page_cache_max_bytes` (blocking; scans the directory)."""
+    if settings.ocr_page_cache_enabled:
+        DiskCache(settings.ocr_page_cache_path, settings.ocr_page_cache_max_bytes).trim()
+
+
+def page_key(image_bytes: bytes, language: str) -> str:
+    digest = hashlib.sha256(image_bytes)
+    digest.update(f":{language}:{engine_signature()}".encode())
+    return digest.hexdigest()
@@ -0,0 +1,195 @@
+"""OCR engines: turn one page image into text inside an OCR worker process.
+
+`TesserocrEngine` uses the Tesseract C API through the optional `tesserocr`
+bindings (`pip install sheaf[tesserocr]`). It keeps one initialized API per
+language for the life of the worker process and gets the page image in
+memory, so the language models are loaded once per worker instead of once per
+page. `TesseractCLIEngine` starts the `tesseract` binary per page, like
+pytesseract does, and is the fallback when the bindings are missing or cannot
+initialize.
+"""
+
+import functools
+import importlib.util
+import logging
+import os
+import subprocess
+import time
+from abc import ABC, abstractmethod
+from tempfile import TemporaryDirectory
+
+import pytesseract
+
+from sheaf.config import settings
+
+logger = logging.getLogger(__name__)
+
+OCR_ENGINES = ("auto", "tesserocr", "cli")
+
+_engine: "OCREngine | None" = None
+
+
+class PageTimeout(Exception):
+    pass
+
+
+class OCRCancelled(Exception):
+    pass
+
+
+def check_cancelled(cancel_token: str | None) -> None:
+    if cancel_token is not None and os.path.exists(cancel_token):
+        raise OCRCancelled()
+
+
+class OCREngine(ABC):
+    """Recognizes page images; one instance per OCR worker process."""
+
+    name: str
+
+    @classmethod
+    @abstractmethod
+    def version(cls) -> str:
+        """Version of the underlying Tesseract, without initializing an engine."""
+
+    @functools.cached_property
+    def signature(self) -> str:
+        """Engine and Tesseract version, for cache keys of text this instance produced."""
+        return f"{self.name}-{self.version()}"
+
+    @abstractmethod
+    def recognize(self, image, language: str, cancel_token: str | None = None) -> str:
+        """Text of one page image; honours `ocr_page_timeout` and `cancel_token`."""
+
+    def close(self) -> None:
+        pass
+
+
+class TesserocrEngine(OCREngine):
+    """Long-lived Tesseract API instances fed with in-memory images."""
+
+    name = "tesserocr"
+
+    def __init__(self, tessdata_path: str = "") -> None:
+        import tesserocr
+
+        self._tesserocr = tesserocr
+        self.tessdata_path = tessdata_path
+        self._apis: dict = {}
+
+    @classmethod
+    def version(cls) -> str:
+        import tesserocr
+
+        # "tesseract 5.3.4\n leptonica-1.82.0 ..."
+        return tesserocr.tesseract_version().split()[1]
+
+    def _api(self, language: str):
+        api = self._apis.get(language)
+        if api is None:
+            options = {"lang": language}
+            if self.tessdata_path:
+                options["path"] = self.tessdata_path
+            api = self._tesserocr.PyTessBaseAPI(**options)
+            self._apis[language] = api
+        return api
+
+    def recognize(self, image, language: str, cancel_token: str | None = None) -> str:
+        # A page in progress cannot be interrupted, so cancellation is
+        # checked between pages and recognition is bounded by the timeout.
+        check_cancelled(cancel_token)
+        api = self._api(language)
+        api.SetImage(image)
+        if not api.Recognize(timeout=int(settings.ocr_page_timeout * 1000)):
+            raise PageTimeout("Tesseract timed out")
+        return api.GetUTF8Text()
+
+    def close(self) -> None:
+        for api in self._apis.values():
+            api.End()
+        self._apis.clear()
+
+
+class TesseractCLIEngine(OCREngine):
+    """One `tesseract` process per page, killed on timeout or cancellation."""
+
+    name = "tesseract"
+
+    @classmethod
+    def version(cls) -> str:
+        try:
+            return str(pytesseract.get_tesseract_version())
+        except Exception:
+            return "unknown"
+
+    def recognize(self, image, language: str, cancel_token: str | None = None) -> str:
+        check_cancelled(cancel_token)
+        with TemporaryDirectory() as tmpdir:
+            source = os.path.join(tmpdir, "page.png")
+            output = os.path.join(tmpdir, "page")
+            image.save(source)
+            with open(os.path.join(tmpdir, "stderr"), "w+b") as stderr:
+                proc = subprocess.Popen(
+                    [pytesseract.pytesseract.tesseract_cmd, source, output, "-l", language],
+                    stdout=subprocess.DEVNULL,
+                    stderr=stderr,
+                )
+                deadline = time.monotonic() + settings.ocr_page_timeout
+                try:
+                    while True:
+                        try:
+                            proc.wait(timeout=0.2)
+                            break
+                        except subprocess.TimeoutExpired:
+                            pass
+                        check_cancelled(cancel_token)
+                        if time.monotonic() > deadline:
+                            raise PageTimeout("Tesseract timed out")
+                finally:
+                    if proc.returncode is None:
+                        proc.kill()
+                        proc.wait()
+                if proc.returncode != 0:
+                    stderr.seek(0)
+                    message = stderr.read().decode(errors="replace").strip()
+                    raise RuntimeError(message[:400] or f"tesseract exited with {proc.returncode}")
+            with open(f"{output}.txt", encoding="utf-8") as f:
+                return f.read()
+
+
+def engine_class() -> type[OCREngine]:
+    """The engine `ocr_engine` selects; "auto" prefers tesserocr when installed.
+
+    `create_engine` may still fall back to the CLI, so cache keys are built
+    from the instance it returns (`OCREngine.signature`), not from this.
+    """
+    if settings.ocr_engine == "cli":
+        return TesseractCLIEngine
+    if settings.ocr_engine == "tesserocr" or importlib.util.find_spec("tesserocr"):
+        return TesserocrEngine
+    return TesseractCLIEngine
+
+
+def create_engine() -> OCREngine:
+    """Build and warm up the configured engine for `settings.ocr_language`."""
+    cls = engine_class()
+    if cls is TesseractCLIEngine:
+        return TesseractCLIEngine()
+    engine = TesserocrEngine(settings.ocr_tessdata_path)
+    try:
+        engine._api(settings.ocr_language)
+    except RuntimeError:
+        if settings.ocr_engine == "tesserocr":
+            raise
+        logger.warning("tesserocr failed to initialize, falling back to the tesseract CLI")
+        engine.close()
+        return TesseractCLIEngine()
+    return engine
+
+
+def get_engine() -> OCREngine:
+    """This process's engine, created on first use and kept for its lifetime."""
+    global _engine
+    if _engine is None:
+        _engine = create_engine()
+    return _engine
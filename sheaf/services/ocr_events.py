@@ -0,0 +1,149 @@
+"""OCR status and progress events for Server-Sent Events streams.
+
+Every change is published on the Redis channel `ocr:events:<user_id>`, so a
+browser connected to any instance sees jobs run by any worker, and one
+channel serves both the per-document and the "all my jobs" stream. An
+instance subscribes to a user's channel only while it has a stream open for
+that user, so it isn't woken for everyone else's jobs. Each process also
+hands its own events straight to its local subscribers, which keeps streams
+working for jobs run in the same process when Redis is down.
+"""
+
+import asyncio
+import contextlib
+import json
+import logging
+import uuid
+import weakref
+
+import redis.asyncio as redis
+from redis.asyncio.client import PubSub
+
+from sheaf.services.cache import get_redis
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = "ocr:events:"
+QUEUE_SIZE = 64
+RECONNECT_SECONDS = 5.0
+RECONCILE_SECONDS = 1.0
+
+
+class OCREventBus:
+    """Fan-out of OCR events to subscriber queues, bridged across instances by Redis."""
+
+    def __init__(self) -> None:
+        self.origin = uuid.uuid4().hex
+        # Weak, so a stream torn down before its generator ever ran cannot leak.
+        self._subscribers: dict[str, weakref.WeakSet[asyncio.Queue]] = {}
+        self._listener: asyncio.Task | None = None
+        self._pubsub: PubSub | None = None
+        self._channels: set[str] = set()  # users whose channel we're subscribed to
+        self.redis_errors = 0
+
+    async def subscribe(self, user_id: str) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self._subscribers.setdefault(user_id, weakref.WeakSet()).add(queue)
+        # Subscribe right away rather than on the listener's next pass, so
+        # events published once the caller has read its snapshot aren't lost.
+        if self._pubsub is not None and user_id not in self._channels:
+            try:
+                await self._pubsub.subscribe(CHANNEL_PREFIX + user_id)
+                self._channels.add(user_id)
+            except redis.RedisError:
+                self.redis_errors += 1
+        return queue
+
+    def unsubscribe(self, user_id: str, queue: asyncio.Queue) -> None:
+        """Drop a local queue; the listener leaves the Redis channel on its next pass."""
+        queues = self._subscribers.get(user_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[user_id]
+
+    def _deliver(self, user_id: str, event: dict) -> None:
+        for queue in list(self._subscribers.get(user_id, ())):
+            if queue.full():
+                # Events are snapshots, so a slow reader only loses stale ones.
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    async def publish(
+        self,
+        user_id: str,
+        doc_id: str,
+        ocr_status: str,
+        pages_done: int = 0,
+        pages_total: int | None = None,
+        ocr_error: str | None = None,
+    ) -> None:
+        event = {
+            "doc_id": doc_id,
+            "ocr_status": ocr_status,
+            "ocr_error": ocr_error,
+            "pages_done": pages_done,
+            "pages_total": pages_total,
+        }
+        self._deliver(user_id, event)
+        try:
+            r = await get_redis()
+            await r.publish(
+                CHANNEL_PREFIX + user_id, json.dumps({"origin": self.origin, "event": event})
+            )
+        except redis.RedisError:
+            self.redis_errors += 1
+
+    def start(self) -> None:
+        """Start relaying events published by other instances."""
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._listener
+            self._listener = None
+
+    async def _reconcile(self) -> None:
+        """Subscribe to the channels of users with open streams, and only those."""
+        wanted = {user_id for user_id, queues in self._subscribers.items() if queues}
+        if wanted - self._channels:
+            await self._pubsub.subscribe(*(CHANNEL_PREFIX + u for u in wanted - self._channels))
+        if self._channels - wanted:
+            await self._pubsub.unsubscribe(*(CHANNEL_PREFIX + u for u in self._channels - wanted))
+        self._channels = wanted
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                r = await get_redis()
+                self._pubsub = r.pubsub()
+                self._channels = set()
+                try:
+                    while True:
+                        await self._reconcile()
+                        if not self._channels:
+                            await asyncio.sleep(RECONCILE_SECONDS)
+                            continue
+                        message = await self._pubsub.get_message(
+                            ignore_subscribe_messages=True, timeout=RECONCILE_SECONDS
+                        )
+                        if message is None or message["type"] != "message":
+                            continue
+                        payload = json.loads(message["data"])
+                        if payload["origin"] == self.origin:
+                            continue
+                        user_id = message["channel"].decode()[len(CHANNEL_PREFIX) :]
+                        self._deliver(user_id, payload["event"])
+                finally:
+                    pubsub, self._pubsub = self._pubsub, None
+                    await pubsub.aclose()
+            except (redis.RedisError, ValueError, KeyError) as exc:
+                self.redis_errors += 1
+                logger.warning("OCR event listener: %s; retrying", exc)
+                await asyncio.sleep(RECONNECT_SECONDS)
+
+
+ocr_events = OCREventBus()
@@ -0,0 +1,471 @@
+"""Durable OCR job queue backed by the `ocr_jobs` table.
+
+Workers claim the highest-priority runnable job with a conditional UPDATE,
+so concurrent workers (in this process or others) never run the same job.
+A claim is a lease that the worker keeps renewing while it works; if the
+process dies or hangs, the lease runs out and the job counts as a failed
+attempt. Failures are retried with exponential backoff up to `max_attempts`,
+so a PDF that keeps crashing its worker eventually fails for good.
+Jobs belonging to a bulk backfill are only claimed inside the backfill's
+time window and while it is under its hourly start cap.
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from sheaf.config import settings
+from sheaf.models.document import Document
+from sheaf.models.ocr_backfill import OCRBackfill
+from sheaf.models.ocr_job import OCRJob
+from sheaf.services.ocr import OCRService
+from sheaf.services.ocr_cache import prune_results
+from sheaf.services.ocr_events import ocr_events
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ("queued", "processing")
+CACHE_PRUNE_INTERVAL = 3600.0
+LEASE_EXPIRED_ERROR = "OCR worker stopped responding (lease expired)"
+
+# Jobs running in this process: job id -> (work task, cancelled flag)
+_local_jobs: dict[str, tuple[asyncio.Task, asyncio.Event]] = {}
+
+
+def _runnable(now: datetime):
+    """Jobs a worker may claim: queued jobs that are due."""
+    return and_(OCRJob.status == "queued", OCRJob.run_after <= now)
+
+
+def parse_window(window: str) -> tuple | None:
+    """Parse "HH:MM-HH:MM" into (start, end) times; "" means no restriction."""
+    if not window:
+        return None
+    start, end = window.split("-")
+    return (
+        datetime.strptime(start.strip(), "%H:%M").time(),
+        datetime.strptime(end.strip(), "%H:%M").time(),
+    )
+
+
+def in_window(window: str, now: datetime) -> bool:
+    """Whether the local time of `now` falls in `window` (which may wrap midnight)."""
+    bounds = parse_window(window)
+    if bounds is None:
+        return True
+    start, end = bounds
+    clock = now.time()
+    if start <= end:
+        return start <= clock < end
+    return clock >= start or clock < end
+
+
+async def open_batch_ids(db: AsyncSession, now: datetime) -> list[str]:
+    """Backfills whose jobs may be claimed right now."""
+    has_queued = select(OCRJob.id).where(
+        OCRJob.batch_id == OCRBackfill.id, OCRJob.status == "queued"
+    )
+    result = await db.execute(
+        select(OCRBackfill).where(OCRBackfill.status == "active", has_queued.exists())
+    )
+    local_now = datetime.now()
+    open_ids = []
+    for batch in result.scalars().all():
+        if not in_window(batch.window, local_now):
+            continue
+        if batch.max_per_hour:
+            started = await db.scalar(
+                select(func.count(OCRJob.id)).where(
+                    OCRJob.batch_id == batch.id,
+                    OCRJob.started_at >= now - timedelta(hours=1),
+                )
+            )
+            if started >= batch.max_per_hour:
+                continue
+        open_ids.append(batch.id)
+    return open_ids
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """Backoff before retry number `attempts` (1-based): base * 2^(n-1), capped."""
+    seconds = settings.ocr_retry_base_seconds * 2 ** max(0, attempts - 1)
+    return timedelta(seconds=min(seconds, settings.ocr_retry_max_seconds))
+
+
+async def active_job(db: AsyncSession, doc_id: str) -> OCRJob | None:
+    result = await db.execute(
+        select(OCRJob)
+        .where(OCRJob.document_id == doc_id, OCRJob.status.in_(ACTIVE_STATUSES))
+        .limit(1)
+    )
+    return result.scalar_one_or_none()
+
+
+async def enqueue_ocr(
+    db: AsyncSession, doc: Document, language: str, priority: int = 0, mode: str = "auto"
+) -> OCRJob:
+    """Queue OCR for `doc` and mark it pending; the caller commits."""
+    job = OCRJob(
+        document_id=doc.id,
+        user_id=doc.owner_id,
+        language=language,
+        mode=mode,
+        priority=priority,
+        max_attempts=settings.ocr_max_attempts,
+        run_after=datetime.utcnow(),
+    )
+    db.add(job)
+    doc.ocr_status = "pending"
+    doc.ocr_error = None
+    return job
+
+
+async def claim_next(db: AsyncSession, worker_id: str) -> OCRJob | None:
+    """Claim the next runnable job for `worker_id`, or return None."""
+    now = datetime.utcnow()
+    await expire_leases(db, now)
+    batches = await open_batch_ids(db, now)
+    candidates = await db.execute(
+        select(OCRJob.id)
+        .where(_runnable(now), or_(OCRJob.batch_id.is_(None), OCRJob.batch_id.in_(batches)))
+        .order_by(OCRJob.priority.desc(), OCRJob.created_at, OCRJob.id)
+        .limit(5)
+    )
+    for job_id in candidates.scalars().all():
+        claimed = await db.execute(
+            update(OCRJob)
+            .where(OCRJob.id == job_id, _runnable(now))
+            .values(
+                status="processing",
+                worker_id=worker_id,
+                lease_expires_at=now + timedelta(seconds=settings.ocr_lease_seconds),
+                started_at=now,
+                attempts=OCRJob.attempts + 1,
+            )
+        )
+        await db.commit()
+        if claimed.rowcount == 1:
+            return await db.get(OCRJob, job_id, populate_existing=True)
+    return None
+
+
+async def heartbeat(db: AsyncSession, job_id: str, worker_id: str) -> bool:
+    """Extend the lease; False means another worker has taken the job over."""
+    result = await db.execute(
+        update(OCRJob)
+        .where(
+            OCRJob.id == job_id,
+            OCRJob.worker_id == worker_id,
+            OCRJob.status == "processing",
+        )
+        .values(lease_expires_at=datetime.utcnow() + timedelta(seconds=settings.ocr_lease_seconds))
+    )
+    await db.commit()
+    return result.rowcount == 1
+
+
+async def _finish(db: AsyncSession, job: OCRJob, owner: str, *conditions, **values) -> bool:
+    """Update a job only while `owner` still holds it."""
+    result = await db.execute(
+        update(OCRJob)
+        .where(
+            OCRJob.id == job.id,
+            OCRJob.worker_id == owner,
+            OCRJob.status == "processing",
+            *conditions,
+        )
+        .values(**values)
+    )
+    await db.commit()
+    return result.rowcount == 1
+
+
+async def complete_job(db: AsyncSession, job: OCRJob, worker_id: str) -> None:
+    await _finish(
+        db,
+        job,
+        worker_id,
+        status="completed",
+        lease_expires_at=None,
+        last_error=None,
+        finished_at=datetime.utcnow(),
+    )
+
+
+async def fail_job(
+    db: AsyncSession,
+    job: OCRJob,
+    worker_id: str,
+    error: str,
+    retry: bool = True,
+    lease_expired_before: datetime | None = None,
+) -> bool:
+    """Requeue with backoff, or give up once attempts are exhausted.
+
+    This also decides the document's status: `pending` while the job will
+    be retried, `failed` once it will not. With `lease_expired_before`, the
+    job is only failed if its lease still ran out before then, so a worker
+    renewing it at the same moment keeps it. Returns whether the job was
+    updated.
+    """
+    error = error[:500]
+    conditions = []
+    if lease_expired_before is not None:
+        conditions.append(OCRJob.lease_expires_at < lease_expired_before)
+    if retry and job.attempts < job.max_attempts:
+        owned = await _finish(
+            db,
+            job,
+            worker_id,
+            *conditions,
+            status="queued",
+            worker_id=None,
+            lease_expires_at=None,
+            last_error=error,
+            run_after=datetime.utcnow() + retry_delay(job.attempts),
+        )
+        doc_status = "pending"
+    else:
+        owned = await _finish(
+            db,
+            job,
+            worker_id,
+            *conditions,
+            status="failed",
+            lease_expires_at=None,
+            last_error=error,
+            finished_at=datetime.utcnow(),
+        )
+        doc_status = "failed"
+    if owned:
+        await db.execute(
+            update(Document)
+            .where(Document.id == job.document_id)
+            .values(ocr_status=doc_status, ocr_error=error)
+        )
+        await db.commit()
+        await ocr_events.publish(job.user_id, job.document_id, doc_status, ocr_error=error)
+    return owned
+
+
+async def expire_leases(db: AsyncSession, now: datetime) -> int:
+    """Fail the running attempt of every job whose lease ran out before `now`.
+
+    The worker crashed, hung or lost its database connection; the attempt
+    counts like any other failure, so the job is retried with backoff or,
+    once out of attempts, fails for good. Returns the number of jobs handled.
+    """
+    result = await db.execute(
+        select(OCRJob).where(OCRJob.status == "processing", OCRJob.lease_expires_at < now)
+    )
+    expired = 0
+    for job in result.scalars().all():
+        if await fail_job(db, job, job.worker_id, LEASE_EXPIRED_ERROR, lease_expired_before=now):
+            logger.warning("OCR job %s lost its worker (attempt %d)", job.id, job.attempts)
+            expired += 1
+    return expired
+
+
+async def release_job(db: AsyncSession, job: OCRJob, worker_id: str) -> None:
+    """Return a claimed job to the queue right away (graceful shutdown)."""
+    owned = await _finish(
+        db,
+        job,
+        worker_id,
+        status="queued",
+        worker_id=None,
+        lease_expires_at=None,
+        run_after=datetime.utcnow(),
+    )
+    if owned:
+        await db.execute(
+            update(Document).where(Document.id == job.document_id).values(ocr_status="pending")
+        )
+        await db.commit()
+        await ocr_events.publish(job.user_id, job.document_id, "pending")
+
+
+async def cancel_job(db: AsyncSession, job: OCRJob) -> bool:
+    """Cancel a queued or running job; the caller commits.
+
+    A worker running the job notices within `ocr_cancel_poll_seconds`, or
+    immediately if it runs in this process, and kills its OCR processes.
+    Returns False, changing nothing, if the job has finished in the meantime.
+    """
+    result = await db.execute(
+        update(OCRJob)
+        .where(OCRJob.id == job.id, OCRJob.status.in_(ACTIVE_STATUSES))
+        .values(status="cancelled", lease_expires_at=None, finished_at=datetime.utcnow())
+    )
+    if result.rowcount != 1:
+        return False
+    await db.execute(
+        update(Document).where(Document.id == job.document_id).values(ocr_status="cancelled")
+    )
+    local = _local_jobs.get(job.id)
+    if local is not None:
+        work, cancelled = local
+        cancelled.set()
+        work.cancel()
+    return True
+
+
+async def reclaim_stale_jobs(db: AsyncSession) -> int:
+    """Requeue work orphaned by a crash or restart.
+
+    Processing jobs whose lease has expired are failed like any other
+    attempt (retried with backoff while attempts remain), and documents left
+    pending/processing without any active job (e.g. from before the queue
+    existed) get a fresh job.
+    """
+    requeued = await expire_leases(db, datetime.utcnow())
+
+    has_job = select(OCRJob.id).where(
+        OCRJob.document_id == Document.id, OCRJob.status.in_(ACTIVE_STATUSES)
+    )
+    orphans = await db.execute(
+        select(Document).where(
+            Document.ocr_status.in_(("pending", "processing")), ~has_job.exists()
+        )
+    )
+    for doc in orphans.scalars().all():
+        await enqueue_ocr(db, doc, settings.ocr_language)
+        requeued += 1
+    await db.commit()
+    return requeued
+
+
+class OCRWorker:
+    """Runs queued OCR jobs; start `settings.ocr_queue_workers` per instance."""
+
+    _last_prune = 0.0  # shared by the workers of this process
+
+    def __init__(self, session_factory: async_sessionmaker[AsyncSession], name: str = "") -> None:
+        self.session_factory = session_factory
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{name or uuid.uuid4().hex[:8]}"
+
+    async def run(self) -> None:
+        """Poll for jobs forever (cancel to stop)."""
+        while True:
+            try:
+                ran = await self.run_once()
+            except Exception:
+                logger.exception("OCR worker %s failed to run a job", self.worker_id)
+                ran = False
+            if not ran:
+                await self._maybe_prune_cache()
+                await asyncio.sleep(settings.ocr_poll_interval_seconds)
+
+    async def _maybe_prune_cache(self) -> None:
+        now = time.monotonic()
+        if now - OCRWorker._last_prune < CACHE_PRUNE_INTERVAL:
+            return
+        OCRWorker._last_prune = now
+        try:
+            async with self.session_factory() as db:
+                removed = await prune_results(db)
+        except Exception:
+            logger.exception("Failed to prune the OCR result cache")
+            return
+        if removed:
+            logger.info("Pruned %d cached OCR results", removed)
+
+    async def run_once(self) -> bool:
+        """Claim and run one job; returns False if the queue had nothing runnable."""
+        # The claim's session is closed before the job runs, so no connection
+        # sits idle in a transaction for the length of the OCR run.
+        async with self.session_factory() as db:
+            job = await claim_next(db, self.worker_id)
+        if job is None:
+            return False
+        await self._run_job(job)
+        return True
+
+    async def _run_job(self, job: OCRJob) -> None:
+        lease_lost = asyncio.Event()
+        cancelled = asyncio.Event()
+        work = asyncio.create_task(self._process(job))
+        _local_jobs[job.id] = (work, cancelled)
+        keepalive = asyncio.create_task(self._keep_lease(job, work, lease_lost, cancelled))
+        try:
+            await work
+        except asyncio.CancelledError:
+            if cancelled.is_set():
+                # The job row is already cancelled; undo any status the run wrote since.
+                async with self.session_factory() as db:
+                    await db.execute(
+                        update(Document)
+                        .where(Document.id == job.document_id)
+                        .values(ocr_status="cancelled")
+                    )
+                    await db.commit()
+                logger.info("OCR job %s cancelled", job.id)
+                return
+            if lease_lost.is_set():
+                # Another worker took the job over; it owns it now.
+                logger.warning("OCR job %s lost its lease", job.id)
+                return
+            # Shutting down: hand the job back instead of waiting for the lease to expire.
+            work.cancel()
+            async with self.session_factory() as db:
+                await release_job(db, job, self.worker_id)
+            raise
+        except ValueError as e:
+            # The document is gone; retrying will not help.
+            async with self.session_factory() as db:
+                await fail_job(db, job, self.worker_id, str(e), retry=False)
+            return
+        except Exception as e:
+            logger.exception("OCR job %s failed (attempt %d)", job.id, job.attempts)
+            async with self.session_factory() as db:
+                await fail_job(db, job, self.worker_id, str(e))
+            return
+        finally:
+            keepalive.cancel()
+            _local_jobs.pop(job.id, None)
+        async with self.session_factory() as db:
+            await complete_job(db, job, self.worker_id)
+
+    async def _process(self, job: OCRJob) -> None:
+        async with self.session_factory() as db:
+            await OCRService(language=job.language).process_document(
+                job.document_id, db, job.user_id, mode=job.mode, job_id=job.id
+            )
+
+    async def _keep_lease(
+        self,
+        job: OCRJob,
+        work: asyncio.Task,
+        lost: asyncio.Event,
+        cancelled: asyncio.Event,
+    ) -> None:
+        """Renew the lease while `work` runs and stop it if the job is cancelled."""
+        renew_every = settings.ocr_lease_seconds / 3
+        last_renewal = time.monotonic()
+        while True:
+            await asyncio.sleep(min(settings.ocr_cancel_poll_seconds, renew_every))
+            try:
+                async with self.session_factory() as db:
+                    status = await db.scalar(select(OCRJob.status).where(OCRJob.id == job.id))
+                    if status == "cancelled":
+                        cancelled.set()
+                        work.cancel()
+                        return
+                    if time.monotonic() - last_renewal < renew_every:
+                        continue
+                    alive = await heartbeat(db, job.id, self.worker_id)
+                    last_renewal = time.monotonic()
+            except Exception:
+                logger.exception("OCR heartbeat failed for job %s", job.id)
+                continue
+            if not alive:
+                lost.set()
+                work.cancel()
+                return
@@ -0,0 +1,149 @@
+"""Single-page rendering with an on-disk cache.
+
+Pages are rasterized one at a time with pdftoppm (via pdf2image's
+`first_page`/`last_page`) on a dedicated thread pool, encoded as WebP and
+kept in a size-bounded disk cache keyed by content hash and render
+parameters, so identical files share renders. Remote PDFs are downloaded
+into a separate disk cache with its own budget, so a burst of renders can
+never evict the source file other renders are about to read.
+"""
+
+import asyncio
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import aiofiles
+from pdf2image import convert_from_path
+from pdf2image.exceptions import PDFPageCountError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from sheaf.config import settings
+from sheaf.dependencies import get_document_storage
+from sheaf.models.document import Document
+from sheaf.services.diskcache import DiskCache
+from sheaf.services.singleflight import SingleFlight
+from sheaf.services.storage import LocalStorage, StorageBackend
+
+
+class PageOutOfRange(Exception):
+    pass
+
+
+class RenderError(Exception):
+    """The PDF could not be read (corrupt, or not really a PDF)."""
+
+
+def _render_sync(
+    pdf_path: str, page: int, width: int, target: Path, quality: int, timeout: int
+) -> None:
+    """Rasterize one page to WebP (runs in the render pool)."""
+    try:
+        images = convert_from_path(
+            pdf_path,
+            first_page=page,
+            last_page=page,
+            size=(width, None),
+            single_file=True,
+            timeout=timeout,
+        )
+    except PDFPageCountError as exc:
+        raise RenderError(str(exc)) from exc
+    if not images:
+        raise PageOutOfRange(f"Page {page} does not exist")
+    image = images[0]
+    try:
+        image.save(target, format="WEBP", quality=quality, method=4)
+    finally:
+        image.close()
+
+
+class PageRenderer:
+    def __init__(
+        self,
+        cache_dir: str,
+        max_bytes: int,
+        source_dir: str,
+        source_max_bytes: int,
+        workers: int,
+        timeout: int,
+        quality: int = 80,
+    ) -> None:
+        self.cache = DiskCache(cache_dir, max_bytes)
+        self.sources = DiskCache(source_dir, source_max_bytes)
+        self.timeout = timeout
+        self.quality = quality
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="render")
+        self._flights = SingleFlight()
+
+    @staticmethod
+    def _source_id(doc: Document) -> str:
+        return doc.content_hash or f"{doc.id}-{doc.size_bytes}"
+
+    def _key(self, doc: Document, page: int, width: int) -> str:
+        raw = f"{self._source_id(doc)}:{page}:{width}:webp:{self.quality}"
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    async def _local_pdf(self, doc: Document, storage: StorageBackend) -> str:
+        """Path to a local copy of the PDF; remote files are cached on disk too."""
+        if isinstance(storage, LocalStorage):
+            return doc.storage_path
+
+        key = hashlib.sha256(f"source:{self._source_id(doc)}".encode()).hexdigest()
+        cached = self.sources.get(key, ".pdf")
+        if cached is not None:
+            return str(cached)
+
+        async def download() -> str:
+            temp = self.sources.temp_path(key, ".pdf")
+            try:
+                async with aiofiles.open(temp, "wb") as f:
+                    async for chunk in storage.iter_chunks(doc.storage_path):
+                        await f.write(chunk)
+            except BaseException:
+                temp.unlink(missing_ok=True)
+                raise
+            return str(self.sources.commit(key, temp, ".pdf"))
+
+        return await self._flights.do(key, download)
+
+    async def render_page(self, doc: Document, db: AsyncSession, page: int, width: int) -> Path:
+        """Return the cached WebP for `page` (1-based), rendering it if needed."""
+        key = self._key(doc, page, width)
+        cached = self.cache.get(key, ".webp")
+        if cached is not None:
+            return cached
+        # Resolved here: the render may outlive this request (and its session).
+        storage = await get_document_storage(doc, db)
+
+        async def render() -> Path:
+            pdf_path = await self._local_pdf(doc, storage)
+            temp = self.cache.temp_path(key, ".webp")
+            loop = asyncio.get_running_loop()
+            try:
+                await loop.run_in_executor(
+                    self._executor,
+                    _render_sync,
+                    pdf_path,
+                    page,
+                    width,
+                    temp,
+                    self.quality,
+                    self.timeout,
+                )
+            except BaseException:
+                temp.unlink(missing_ok=True)
+                raise
+            return self.cache.commit(key, temp, ".webp")
+
+        return await self._flights.do(key, render)
+
+
+page_renderer = PageRenderer(
+    cache_dir=settings.render_cache_path,
+    max_bytes=settings.render_cache_max_bytes,
+    source_dir=settings.render_source_cache_path,
+    source_max_bytes=settings.render_source_cache_max_bytes,
+    workers=settings.render_workers,
+    timeout=settings.render_timeout,
+)
@@ -1,10 +1,215 @@
-from dataclasses import dataclass
+import html
+import re
+from dataclasses import dataclass, field
 
-from sqlalchemy import text, select
+from sqlalchemy import bindparam, text, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from sheaf.config import settings
 from sheaf.models.document import Document
+from sheaf.services.search_cache import Hit, search_cache
+
+# Highlights come back from the database between these private-use
+# characters; the text is HTML-escaped before they become <mark> tags, so
+# document text can never inject markup into a snippet.
+MARK_START = "\ue000"
+MARK_END = "\ue001"
+HEADLINE_OPTIONS = f"StartSel={MARK_START}, StopSel={MARK_END}, MaxWords=50, MinWords=20"
+
+# Both queries filter on `search_vector @@ query`, which the GIN index
+# idx_documents_search_vector serves; the total comes from a window count.
+PG_SEARCH_SQL = text("""
+    SELECT
+        id,
+        ts_rank(search_vector, plainto_tsquery('english', :query)) AS rank,
+        COUNT(*) OVER () AS total
+    FROM documents
+    WHERE owner_id = :user_id
+      AND search_vector @@ plainto_tsquery('english', :query)
+    ORDER BY rank DESC
+    LIMIT :limit OFFSET :offset
+""")
+
+PG_COUNT_SQL = text("""
+    SELECT COUNT(*)
+    FROM documents
+    WHERE owner_id = :user_id
+      AND search_vector @@ plainto_tsquery('english', :query)
+""")
+
+# The best-ranked pages of each returned document, matching any of the
+# words: a document matches when all of them appear somewhere in it, not
+# necessarily on one page. Headlines run over those page rows only.
+PG_PAGE_HITS_SQL = text("""
+    SELECT
+        document_id,
+        page_no,
+        ts_headline('english', text, any_word, :headline_options) AS snippet
+    FROM (
+        SELECT
+            document_id,
+            page_no,
+            text,
+            any_word,
+            row_number() OVER (
+                PARTITION BY document_id
+                ORDER BY ts_rank(search_vector, any_word) DESC, page_no
+            ) AS n
+        FROM document_pages
+        CROSS JOIN (
+            SELECT CAST(
+                replace(CAST(plainto_tsquery('english', :query) AS text), '&', '|') AS tsquery
+            ) AS any_word
+        ) q
+        WHERE document_id IN :doc_ids
+          AND search_vector @@ any_word
+    ) hits
+    WHERE n <= :per_doc
+    ORDER BY document_id, n
+""").bindparams(bindparam("doc_ids", expanding=True))
+
+# Documents without page rows (see `sheaf split-pages`) are highlighted over
+# a bounded window of their text around the first word starting with the
+# stem of the first query word after a space (any substring match if there
+# is none). The offset comes from plain searches that stop at the first
+# match; the text is never rewritten.
+PG_SNIPPET_SQL = text("""
+    SELECT
+        id,
+        ts_headline('english',
+            substr(extracted_text, greatest(coalesce(
+                nullif(strpos(lower(extracted_text), ' ' || :term), 0),
+                strpos(lower(extracted_text), :term)) - :radius, 1), :window),
+            plainto_tsquery('english', :query),
+            :headline_options)
+    FROM documents
+    WHERE id IN :doc_ids
+""").bindparams(bindparam("doc_ids", expanding=True))
+
+SQLITE_SEARCH_SQL = text("""
+    SELECT d.id, bm25(documents_fts) AS score
+    FROM documents_fts
+    JOIN documents_fts_rows m ON m.rowid = documents_fts.rowid
+    JOIN documents d ON d.id = m.doc_id
+    WHERE documents_fts MATCH :match
+      AND d.owner_id = :user_id
+    ORDER BY score
+    LIMIT :limit OFFSET :offset
+""")
+
+SQLITE_COUNT_SQL = text("""
+    SELECT COUNT(*)
+    FROM documents_fts
+    JOIN documents_fts_rows m ON m.rowid = documents_fts.rowid
+    JOIN documents d ON d.id = m.doc_id
+    WHERE documents_fts MATCH :match
+      AND d.owner_id = :user_id
+""")
+
+# The same window as PG_SNIPPET_SQL, for `excerpt` to highlight.
+SQLITE_WINDOW_SQL = text("""
+    SELECT
+        id,
+        substr(extracted_text, max(coalesce(
+            nullif(instr(lower(extracted_text), ' ' || :term), 0),
+            instr(lower(extracted_text), :term)) - :radius, 1), :window)
+    FROM documents
+    WHERE id IN :doc_ids
+""").bindparams(bindparam("doc_ids", expanding=True))
+
+# FTS5 auxiliary functions cannot run under a window function, so the best
+# pages per document are picked in Python from these (small) rows.
+SQLITE_PAGE_HITS_SQL = text("""
+    SELECT document_pages_fts.rowid, p.document_id, p.page_no, bm25(document_pages_fts) AS score
+    FROM document_pages_fts
+    JOIN document_pages_fts_rows m ON m.rowid = document_pages_fts.rowid
+    JOIN document_pages p ON p.id = m.page_id
+    WHERE document_pages_fts MATCH :any_word
+      AND p.document_id IN :doc_ids
+    ORDER BY score, p.page_no
+""").bindparams(bindparam("doc_ids", expanding=True))
+
+SQLITE_PAGE_SNIPPET_SQL = text("""
+    SELECT rowid, snippet(document_pages_fts, 0, :mark_start, :mark_end, '…', 32)
+    FROM document_pages_fts
+    WHERE document_pages_fts MATCH :any_word
+      AND rowid IN :rowids
+""").bindparams(bindparam("rowids", expanding=True))
+
+
+def fts5_query(query: str, any_word: bool = False) -> str:
+    """Turn free text into an FTS5 query matching all words, like plainto_tsquery."""
+    terms = [term.replace('"', '""') for term in query.split()]
+    return (" OR " if any_word else " ").join(f'"{term}"' for term in terms)
+
+
+_SUFFIXES = (
+    "ations",
+    "ation",
+    "ments",
+    "ment",
+    "ness",
+    "ings",
+    "ing",
+    "ies",
+    "ed",
+    "es",
+    "ly",
+    "s",
+)
+
+
+def stem(word: str) -> str:
+    """A prefix shared by a word's inflections, standing in for its Porter stem.
+
+    Used to find where the full-text match is in text the search engine did
+    not highlight: "running", "runs" -> "run", "foxes" -> "fox".
+    """
+    word = word.lower()
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            word = word[: -len(suffix)]
+            break
+    if len(word.rstrip("eiy")) >= 3:
+        word = word.rstrip("eiy")
+    if len(word) > 3 and word[-1] == word[-2]:
+        word = word[:-1]
+    return word
+
+
+def highlight(marked: str) -> str:
+    """HTML-escape text and turn MARK_START/MARK_END into <mark> tags."""
+    escaped = html.escape(marked, quote=False)
+    return escaped.replace(MARK_START, "<mark>").replace(MARK_END, "</mark>")
+
+
+def excerpt(text: str, query: str, words: int = 32) -> str:
+    """Highlight query words in a few words of `text` around the first match.
+
+    For text without an FTS row; words starting with the stem of a query
+    word count as matches, which roughly covers what stemming would.
+    Returns HTML (escaped text with <mark> highlights).
+    """
+    terms = "|".join(re.escape(stem(term)) for term in query.split())
+    pattern = re.compile(rf"\b(?:{terms})\w*", re.IGNORECASE)
+    tokens = text.replace(MARK_START, "").replace(MARK_END, "").split()
+    first = next((i for i, token in enumerate(tokens) if pattern.search(token)), 0)
+    start = max(first - words // 4, 0)
+    shown = " ".join(tokens[start : start + words])
+    snippet = highlight(pattern.sub(lambda m: f"{MARK_START}{m.group(0)}{MARK_END}", shown))
+    return ("…" if start else "") + snippet + ("…" if start + words < len(tokens) else "")
+
+
+def _window(query: str) -> dict:
+    """Bounds of the text window highlighted for documents without page rows."""
+    window = settings.search_snippet_window_chars
+    return {"term": stem(query.split()[0]), "radius": window // 2, "window": window}
+
+
+@dataclass
+class PageHit:
+    page_no: int  # 1-based
+    snippet: str
 
 
 @dataclass
@@ -13,6 +218,7 @@ class SearchResult:
     original_name: str
     snippet: str
     rank: float
+    pages: list[PageHit] = field(default_factory=list)  # best-matching pages first
 
 
 class SearchService:
@@ -23,102 +229,190 @@ class SearchService:
         db: AsyncSession,
         limit: int = 20,
         offset: int = 0,
+        snippets: bool = True,
     ) -> tuple[list[SearchResult], int]:
-        """Full-text search in document extracted_text."""
-        if "postgresql" in settings.database_url:
-            return await self._search_postgresql(query, user_id, db, limit, offset)
+        """Full-text search in document text, with the best-matching pages of each hit.
+
+        Documents are matched and ranked on their whole text; the ranking is
+        cached per corpus version (see `search_cache`), so paging through
+        results and repeating a search only look up names, page hits and
+        snippets for the documents on the requested page. With
+        `snippets=False` those are left out, to be fetched with `snippets()`.
+        """
+        rank = self._rank_postgresql if self._postgresql() else self._rank_sqlite
+        hits, total = await self._ranking(rank, query, user_id, db, limit, offset)
+        results = await self._results(user_id, db, hits)
+        if snippets:
+            await self._annotate(query, db, results)
+        return results, total
+
+    async def snippets(
+        self, query: str, user_id: str, db: AsyncSession, doc_ids: list[str]
+    ) -> list[SearchResult]:
+        """Page hits and snippets for documents of a search run with `snippets=False`."""
+        results = await self._results(user_id, db, [(doc_id, 0.0) for doc_id in doc_ids])
+        await self._annotate(query, db, results)
+        return results
+
+    @staticmethod
+    def _postgresql() -> bool:
+        return "postgresql" in settings.database_url
+
+    async def _results(self, user_id: str, db: AsyncSession, hits: list[Hit]) -> list[SearchResult]:
+        """Results for the user's documents among `hits`, in order, without snippets."""
+        if not hits:
+            return []
+        names = await db.execute(
+            select(Document.id, Document.original_name).where(
+                Document.id.in_([doc_id for doc_id, _ in hits]), Document.owner_id == user_id
+            )
+        )
+        names = dict(names.all())
+        return [
+            SearchResult(id=doc_id, original_name=names[doc_id], snippet="", rank=rank)
+            for doc_id, rank in hits
+            if doc_id in names
+        ]
+
+    async def _annotate(self, query: str, db: AsyncSession, results: list[SearchResult]) -> None:
+        """Attach page hits and snippets, computed for these results only."""
+        if not results or not query.split():
+            return
+        by_id = {r.id: r for r in results}
+        if self._postgresql():
+            await self._annotate_postgresql(query, db, by_id)
         else:
-            return await self._search_sqlite(query, user_id, db, limit, offset)
+            await self._annotate_sqlite(query, db, by_id)
+        for r in results:
+            if r.pages:
+                r.snippet = r.pages[0].snippet
+
+    async def _ranking(
+        self, rank, query: str, user_id: str, db: AsyncSession, limit: int, offset: int
+    ) -> tuple[list[Hit], int]:
+        """One page of the ranked hit list, from the cache when possible."""
+        version = await search_cache.version(user_id)
+        if version is None:
+            return await rank(query, user_id, db, limit, offset)
 
-    async def _search_postgresql(
+        cached = await search_cache.get(user_id, version, query)
+        if cached is None:
+            # Rank once up to the cap; paging then slices the cached list.
+            cached = await rank(query, user_id, db, settings.search_cache_max_hits, 0)
+            await search_cache.set(user_id, version, query, *cached)
+        hits, total = cached
+        if offset + limit > len(hits) and len(hits) < total:
+            # Past the cached prefix of a very broad query.
+            return await rank(query, user_id, db, limit, offset)
+        return hits[offset : offset + limit], total
+
+    async def _rank_postgresql(
         self,
         query: str,
         user_id: str,
         db: AsyncSession,
         limit: int,
         offset: int,
-    ) -> tuple[list[SearchResult], int]:
-        """PostgreSQL full-text search using tsvector."""
-        count_sql = text("""
-            SELECT COUNT(*)
-            FROM documents
-            WHERE owner_id = :user_id
-              AND extracted_text IS NOT NULL
-              AND to_tsvector('english', extracted_text) @@ plainto_tsquery('english', :query)
-        """)
-
-        search_sql = text("""
-            SELECT
-                id,
-                original_name,
-                ts_headline('english', extracted_text, plainto_tsquery('english', :query),
-                    'StartSel=<mark>, StopSel=</mark>, MaxWords=50, MinWords=20') as snippet,
-                ts_rank(to_tsvector('english', extracted_text), plainto_tsquery('english', :query)) as rank
-            FROM documents
-            WHERE owner_id = :user_id
-              AND extracted_text IS NOT NULL
-              AND to_tsvector('english', extracted_text) @@ plainto_tsquery('english', :query)
-            ORDER BY rank DESC
-            LIMIT :limit OFFSET :offset
-        """)
-
+    ) -> tuple[list[Hit], int]:
+        """PostgreSQL full-text ranking on the stored, GIN-indexed search_vector."""
         params = {"user_id": user_id, "query": query, "limit": limit, "offset": offset}
 
-        count_result = await db.execute(count_sql, params)
-        total = count_result.scalar() or 0
-
-        result = await db.execute(search_sql, params)
+        result = await db.execute(PG_SEARCH_SQL, params)
         rows = result.fetchall()
+        if rows:
+            total = rows[0][2]
+        elif offset:
+            # Past the last hit, the window count is not available.
+            total = (await db.execute(PG_COUNT_SQL, params)).scalar() or 0
+        else:
+            total = 0
 
-        results = [
-            SearchResult(id=row[0], original_name=row[1], snippet=row[2], rank=row[3])
-            for row in rows
-        ]
+        return [(row[0], row[1]) for row in rows], total
 
-        return results, total
+    async def _annotate_postgresql(
+        self, query: str, db: AsyncSession, results: dict[str, SearchResult]
+    ) -> None:
+        """Attach page hits with ts_headline snippets to `results`."""
+        page_rows = await db.execute(
+            PG_PAGE_HITS_SQL,
+            {
+                "query": query,
+                "doc_ids": list(results),
+                "per_doc": settings.search_pages_per_hit,
+                "headline_options": HEADLINE_OPTIONS,
+            },
+        )
+        for doc_id, page_no, snippet in page_rows:
+            results[doc_id].pages.append(PageHit(page_no=page_no, snippet=highlight(snippet)))
+
+        unpaged = [doc_id for doc_id, r in results.items() if not r.pages]
+        if unpaged:
+            params = {"query": query, "doc_ids": unpaged, "headline_options": HEADLINE_OPTIONS}
+            snippet_rows = await db.execute(PG_SNIPPET_SQL, {**params, **_window(query)})
+            for doc_id, snippet in snippet_rows:
+                results[doc_id].snippet = highlight(snippet or "")
 
-    async def _search_sqlite(
+    async def _rank_sqlite(
         self,
         query: str,
         user_id: str,
         db: AsyncSession,
         limit: int,
         offset: int,
-    ) -> tuple[list[SearchResult], int]:
-        """Simple LIKE-based search for SQLite fallback."""
-        search_pattern = f"%{query}%"
-
-        count_sql = text("""
-            SELECT COUNT(*)
-            FROM documents
-            WHERE owner_id = :user_id
-              AND extracted_text IS NOT NULL
-              AND extracted_text LIKE :pattern
-        """)
-
-        search_sql = text("""
-            SELECT id, original_name, SUBSTR(extracted_text, 1, 200) as snippet
-            FROM documents
-            WHERE owner_id = :user_id
-              AND extracted_text IS NOT NULL
-              AND extracted_text LIKE :pattern
-            LIMIT :limit OFFSET :offset
-        """)
-
-        params = {"user_id": user_id, "pattern": search_pattern, "limit": limit, "offset": offset}
-
-        count_result = await db.execute(count_sql, params)
-        total = count_result.scalar() or 0
-
-        result = await db.execute(search_sql, params)
+    ) -> tuple[list[Hit], int]:
+        """SQLite FTS5 ranking by bm25."""
+        match = fts5_query(query)
+        if not match:
+            return [], 0
+        params = {"user_id": user_id, "match": match, "limit": limit, "offset": offset}
+
+        result = await db.execute(SQLITE_SEARCH_SQL, params)
         rows = result.fetchall()
+        if offset == 0 and len(rows) < limit:
+            total = len(rows)
+        else:
+            total = (await db.execute(SQLITE_COUNT_SQL, params)).scalar() or 0
 
-        results = [
-            SearchResult(id=row[0], original_name=row[1], snippet=row[2], rank=1.0)
-            for row in rows
-        ]
+        # bm25 is lower-is-better
+        return [(doc_id, -score) for doc_id, score in rows], total
 
-        return results, total
+    async def _annotate_sqlite(
+        self, query: str, db: AsyncSession, results: dict[str, SearchResult]
+    ) -> None:
+        """Attach page hits with FTS5 snippets to `results`."""
+        any_word = fts5_query(query, any_word=True)
+        page_rows = await db.execute(
+            SQLITE_PAGE_HITS_SQL, {"any_word": any_word, "doc_ids": list(results)}
+        )
+        best: dict[int, tuple[str, int]] = {}  # fts rowid -> (doc id, page no)
+        per_doc: dict[str, int] = {}
+        for rowid, doc_id, page_no, _ in page_rows:
+            if per_doc.get(doc_id, 0) < settings.search_pages_per_hit:
+                per_doc[doc_id] = per_doc.get(doc_id, 0) + 1
+                best[rowid] = (doc_id, page_no)
+
+        # Snippets only for the pages shown, not for every matching page.
+        if best:
+            snippet_rows = await db.execute(
+                SQLITE_PAGE_SNIPPET_SQL,
+                {
+                    "any_word": any_word,
+                    "rowids": list(best),
+                    "mark_start": MARK_START,
+                    "mark_end": MARK_END,
+                },
+            )
+            snippets = dict(snippet_rows.fetchall())
+            for rowid, (doc_id, page_no) in best.items():
+                results[doc_id].pages.append(
+                    PageHit(page_no=page_no, snippet=highlight(snippets.get(rowid, "")))
+                )
+
+        unpaged = [doc_id for doc_id, r in results.items() if not r.pages]
+        if unpaged:
+            windows = await db.execute(SQLITE_WINDOW_SQL, {"doc_ids": unpaged, **_window(query)})
+            for doc_id, window in windows:
+                results[doc_id].snippet = excerpt(window, query)
 
 
 search_service = SearchService()
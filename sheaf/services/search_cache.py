@@ -0,0 +1,103 @@
+"""Ranked search hit lists cached in Redis.
+
+A search is cached as its ordered `(document id, rank)` list under
+`search:r:<user_id>:<version>:<query hash>`, where the version is a per-user
+counter (`search:v:<user_id>`) bumped whenever that user's searchable corpus
+changes: a document is uploaded or deleted, or OCR completes. Stale rankings
+are never invalidated one by one, they just stop being looked up and expire.
+
+The counter starts from the current time in nanoseconds, not from 0, so a
+counter lost to a Redis restart or eviction cannot come back at a value that
+old rankings were stored under. Redis is best-effort: on errors searches run
+uncached.
+"""
+
+import hashlib
+import json
+import time
+
+import redis.asyncio as redis
+
+from sheaf.config import settings
+from sheaf.services.cache import get_redis
+
+Hit = tuple[str, float]  # document id, rank
+
+
+def normalize_query(query: str) -> str:
+    """Case and whitespace variants of a query share one cached ranking."""
+    return " ".join(query.lower().split())
+
+
+class SearchCache:
+    def __init__(self, ttl: int) -> None:
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.redis_errors = 0
+
+    @staticmethod
+    def version_key(user_id: str) -> str:
+        return f"search:v:{user_id}"
+
+    @staticmethod
+    def ranking_key(user_id: str, version: str, query: str) -> str:
+        digest = hashlib.sha256(normalize_query(query).encode()).hexdigest()[:32]
+        return f"search:r:{user_id}:{version}:{digest}"
+
+    async def version(self, user_id: str) -> str | None:
+        """The user's corpus version, or None when Redis is unavailable."""
+        key = self.version_key(user_id)
+        try:
+            r = await get_redis()
+            async with r.pipeline(transaction=False) as pipe:
+                pipe.set(key, time.time_ns(), nx=True)
+                pipe.get(key)
+                _, value = await pipe.execute()
+        except redis.RedisError:
+            self.redis_errors += 1
+            return None
+        return value.decode() if isinstance(value, bytes) else str(value)
+
+    async def bump(self, user_id: str) -> None:
+        """Retire every cached ranking of this user."""
+        key = self.version_key(user_id)
+        try:
+            r = await get_redis()
+            async with r.pipeline(transaction=False) as pipe:
+                pipe.set(key, time.time_ns(), nx=True)
+                pipe.incr(key)
+                await pipe.execute()
+        except redis.RedisError:
+            self.redis_errors += 1
+
+    async def get(self, user_id: str, version: str, query: str) -> tuple[list[Hit], int] | None:
+        """The cached ranking and total match count, if any."""
+        try:
+            r = await get_redis()
+            value = await r.get(self.ranking_key(user_id, version, query))
+        except redis.RedisError:
+            self.redis_errors += 1
+            return None
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        data = json.loads(value)
+        return [(doc_id, rank) for doc_id, rank in data["hits"]], data["total"]
+
+    async def set(
+        self, user_id: str, version: str, query: str, hits: list[Hit], total: int
+    ) -> None:
+        value = json.dumps({"hits": hits, "total": total}, separators=(",", ":"))
+        try:
+            r = await get_redis()
+            await r.set(self.ranking_key(user_id, version, query), value, ex=self.ttl)
+        except redis.RedisError:
+            self.redis_errors += 1
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "redis_errors": self.redis_errors}
+
+
+search_cache = SearchCache(ttl=settings.search_cache_ttl_seconds)
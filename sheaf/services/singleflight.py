@@ -0,0 +1,43 @@
+import asyncio
+from collections.abc import Awaitable, Callable
+from typing import TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Coalesce concurrent work for the same key within this process.
+
+    The first caller for a key starts the work in its own task; every caller,
+    the first one included, awaits that task through `asyncio.shield`. A
+    caller that is cancelled (say, its client disconnected) only stops
+    waiting: the work carries on for the others, who never see the
+    cancellation.
+    """
+
+    def __init__(self) -> None:
+        self._inflight: dict[str, asyncio.Task] = {}
+
+    def inflight(self, key: str) -> asyncio.Task | None:
+        return self._inflight.get(key)
+
+    def start(self, keys: list[str], fn: Callable[[], Awaitable[T]]) -> asyncio.Task:
+        """Run `fn` detached, as the work in flight for every key in `keys`."""
+        task = asyncio.ensure_future(fn())
+        for key in keys:
+            self._inflight[key] = task
+
+        def done(task: asyncio.Task) -> None:
+            for key in keys:
+                if self._inflight.get(key) is task:
+                    del self._inflight[key]
+            if not task.cancelled():
+                # Every waiter may have been cancelled; don't warn about it.
+                task.exception()
+
+        task.add_done_callback(done)
+        return task
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        task = self._inflight.get(key) or self.start([key], fn)
+        return await asyncio.shield(task)
@@ -1,4 +1,4 @@
-from sheaf.services.storage.base import StorageBackend
+from sheaf.services.storage.base import StagedUpload, StorageBackend
 from sheaf.services.storage.local import LocalStorage
 
-__all__ = ["StorageBackend", "LocalStorage"]
+__all__ = ["StorageBackend", "StagedUpload", "LocalStorage"]
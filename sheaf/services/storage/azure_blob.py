@@ -3,7 +3,49 @@
 Requires the `azure` extra: pip install sheaf[azure]
 """
 
-from sheaf.services.storage.base import StorageBackend
+import base64
+from collections.abc import AsyncIterator
+
+from sheaf.services.storage.base import DEFAULT_CHUNK_SIZE, StagedUpload, StorageBackend
+
+BLOCK_SIZE = 8 * 1024 * 1024
+
+
+class _AzureStagedUpload(StagedUpload):
+    """Stages fixed-size blocks and commits the block list at the end.
+
+    Uncommitted blocks are never visible and are garbage-collected by Azure,
+    so aborting needs no cleanup call.
+    """
+
+    def __init__(self, blob, filename: str) -> None:
+        self.blob = blob
+        self.filename = filename
+        self.buffer = bytearray()
+        self.block_ids: list[str] = []
+
+    async def _stage(self, data: bytes) -> None:
+        block_id = base64.b64encode(f"{len(self.block_ids):08d}".encode()).decode()
+        await self.blob.stage_block(block_id, data)
+        self.block_ids.append(block_id)
+
+    async def write(self, chunk: bytes) -> None:
+        self.buffer.extend(chunk)
+        while len(self.buffer) >= BLOCK_SIZE:
+            await self._stage(bytes(self.buffer[:BLOCK_SIZE]))
+            del self.buffer[:BLOCK_SIZE]
+
+    async def commit(self) -> str:
+        from azure.storage.blob import BlobBlock
+
+        if self.buffer or not self.block_ids:
+            await self._stage(bytes(self.buffer))
+            self.buffer.clear()
+        await self.blob.commit_block_list([BlobBlock(block_id=b) for b in self.block_ids])
+        return self.filename
+
+    async def abort(self) -> None:
+        self.buffer.clear()
 
 
 class AzureBlobStorage(StorageBackend):
@@ -18,6 +60,10 @@ class AzureBlobStorage(StorageBackend):
         self.client = BlobServiceClient.from_connection_string(connection_string)
         self.container_name = container_name
 
+    @property
+    def namespace(self) -> str:
+        return f"azure:{self.client.account_name}/{self.container_name}"
+
     async def _container(self):
         return self.client.get_container_client(self.container_name)
 
@@ -27,12 +73,39 @@ class AzureBlobStorage(StorageBackend):
         await blob.upload_blob(data, overwrite=True)
         return filename
 
+    async def begin_upload(self, filename: str) -> StagedUpload:
+        container = await self._container()
+        return _AzureStagedUpload(container.get_blob_client(filename), filename)
+
     async def load(self, path: str) -> bytes:
         container = await self._container()
         blob = container.get_blob_client(path)
         stream = await blob.download_blob()
         return await stream.readall()
 
+    async def load_range(self, path: str, offset: int, length: int) -> bytes:
+        container = await self._container()
+        blob = container.get_blob_client(path)
+        stream = await blob.download_blob(offset=offset, length=length)
+        return await stream.readall()
+
+    async def iter_chunks(
+        self,
+        path: str,
+        offset: int = 0,
+        length: int | None = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> AsyncIterator[bytes]:
+        container = await self._container()
+        blob = container.get_blob_client(path)
+        stream = await blob.download_blob(
+            offset=offset,
+            length=length,
+            max_concurrency=1,
+        )
+        async for chunk in stream.chunks():
+            yield chunk
+
     async def delete(self, path: str) -> None:
         container = await self._container()
         blob = container.get_blob_client(path)
@@ -1,7 +1,54 @@
 from abc import ABC, abstractmethod
+from collections.abc import AsyncIterator
+from pathlib import Path
+
+import aiofiles
+
+DEFAULT_CHUNK_SIZE = 256 * 1024
+
+
+class StagedUpload(ABC):
+    """A file being written in chunks; invisible until `commit` succeeds."""
+
+    @abstractmethod
+    async def write(self, chunk: bytes) -> None:
+        """Append a chunk."""
+
+    @abstractmethod
+    async def commit(self) -> str:
+        """Publish the file atomically and return its storage path."""
+
+    @abstractmethod
+    async def abort(self) -> None:
+        """Discard everything written so far."""
+
+
+class _BufferedUpload(StagedUpload):
+    def __init__(self, backend: "StorageBackend", filename: str) -> None:
+        self.backend = backend
+        self.filename = filename
+        self.buffer = bytearray()
+
+    async def write(self, chunk: bytes) -> None:
+        self.buffer.extend(chunk)
+
+    async def commit(self) -> str:
+        return await self.backend.save(self.filename, bytes(self.buffer))
+
+    async def abort(self) -> None:
+        self.buffer.clear()
 
 
 class StorageBackend(ABC):
+    @property
+    def namespace(self) -> str:
+        """Identifies the physical location files are written to.
+
+        Two backend instances with the same namespace can share stored files,
+        which is what content-addressed deduplication keys on.
+        """
+        return self.__class__.__name__
+
     @abstractmethod
     async def save(self, filename: str, data: bytes) -> str:
         """Save file and return storage path."""
@@ -17,3 +64,46 @@ class StorageBackend(ABC):
     @abstractmethod
     async def exists(self, path: str) -> bool:
         """Check if file exists at storage path."""
+
+    async def begin_upload(self, filename: str) -> StagedUpload:
+        """Start a chunked write of `filename`.
+
+        Backends should override this to stream to their medium; the default
+        buffers in memory and calls `save` on commit.
+        """
+        return _BufferedUpload(self, filename)
+
+    async def load_range(self, path: str, offset: int, length: int) -> bytes:
+        """Load `length` bytes starting at `offset`.
+
+        Backends should override this with a native ranged read; the default
+        falls back to loading the whole file.
+        """
+        data = await self.load(path)
+        return data[offset : offset + length]
+
+    async def iter_chunks(
+        self,
+        path: str,
+        offset: int = 0,
+        length: int | None = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> AsyncIterator[bytes]:
+        """Yield file contents in chunks, optionally restricted to a byte range."""
+        data = await self.load(path)
+        end = len(data) if length is None else min(len(data), offset + length)
+        for pos in range(offset, end, chunk_size):
+            yield data[pos : min(pos + chunk_size, end)]
+
+    async def local_copy(self, path: str, directory: str) -> str:
+        """Return a filesystem path with the file's contents.
+
+        Tools that need a real file (poppler, qpdf) use this. The default
+        downloads into `directory`; backends that already keep files on disk
+        return the stored path as is.
+        """
+        target = Path(directory) / Path(path).name
+        async with aiofiles.open(target, "wb") as f:
+            async for chunk in self.iter_chunks(path):
+                await f.write(chunk)
+        return str(target)
@@ -1,9 +1,43 @@
 import os
+import uuid
+from collections.abc import AsyncIterator
 from pathlib import Path
 
 import aiofiles
 
-from sheaf.services.storage.base import StorageBackend
+from sheaf.services.storage.base import DEFAULT_CHUNK_SIZE, StagedUpload, StorageBackend
+
+
+class _LocalStagedUpload(StagedUpload):
+    """Writes to a hidden temp file next to the target, then renames it into place."""
+
+    def __init__(self, final_path: Path) -> None:
+        self.final_path = final_path
+        self.temp_path = final_path.with_name(f".{final_path.name}.{uuid.uuid4().hex}.part")
+        self._file = None
+
+    async def _open(self):
+        if self._file is None:
+            self.final_path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = await aiofiles.open(self.temp_path, "wb")
+        return self._file
+
+    async def write(self, chunk: bytes) -> None:
+        f = await self._open()
+        await f.write(chunk)
+
+    async def commit(self) -> str:
+        f = await self._open()
+        await f.flush()
+        await f.close()
+        os.replace(self.temp_path, self.final_path)
+        return str(self.final_path)
+
+    async def abort(self) -> None:
+        if self._file is not None:
+            await self._file.close()
+        if self.temp_path.exists():
+            os.remove(self.temp_path)
 
 
 class LocalStorage(StorageBackend):
@@ -11,6 +45,10 @@ class LocalStorage(StorageBackend):
         self.base_path = Path(base_path)
         self.base_path.mkdir(parents=True, exist_ok=True)
 
+    @property
+    def namespace(self) -> str:
+        return f"local:{self.base_path.resolve()}"
+
     async def save(self, filename: str, data: bytes) -> str:
         file_path = self.base_path / filename
         file_path.parent.mkdir(parents=True, exist_ok=True)
@@ -18,10 +56,40 @@ class LocalStorage(StorageBackend):
             await f.write(data)
         return str(file_path)
 
+    async def begin_upload(self, filename: str) -> StagedUpload:
+        return _LocalStagedUpload(self.base_path / filename)
+
     async def load(self, path: str) -> bytes:
         async with aiofiles.open(path, "rb") as f:
             return await f.read()
 
+    async def load_range(self, path: str, offset: int, length: int) -> bytes:
+        async with aiofiles.open(path, "rb") as f:
+            await f.seek(offset)
+            return await f.read(length)
+
+    async def iter_chunks(
+        self,
+        path: str,
+        offset: int = 0,
+        length: int | None = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> AsyncIterator[bytes]:
+        remaining = length
+        async with aiofiles.open(path, "rb") as f:
+            await f.seek(offset)
+            while remaining is None or remaining > 0:
+                size = chunk_size if remaining is None else min(chunk_size, remaining)
+                chunk = await f.read(size)
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+
+    async def local_copy(self, path: str, directory: str) -> str:
+        return path
+
     async def delete(self, path: str) -> None:
         p = Path(path)
         if p.exists():
@@ -0,0 +1,78 @@
+import hashlib
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+
+from fastapi import HTTPException, UploadFile
+
+from sheaf.services.storage import StorageBackend
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+@dataclass
+class HashedUpload:
+    size_bytes: int
+    content_hash: str
+    # Writes the bytes to storage and returns the storage path; only called
+    # when no stored file with the same hash exists yet.
+    store: Callable[[], Awaitable[str]]
+
+
+def upload_too_large(max_bytes: int) -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"File exceeds the {max_bytes} byte upload limit",
+    )
+
+
+async def hash_upload(
+    file: UploadFile,
+    storage: StorageBackend,
+    filename: str,
+    max_bytes: int,
+) -> HashedUpload:
+    """Hash and measure an upload that Starlette has already spooled locally.
+
+    Nothing is written to storage yet: `store` copies the file chunk by chunk
+    later, if it turns out to be new. Memory use is bounded by
+    UPLOAD_CHUNK_SIZE regardless of file size.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+        size += len(chunk)
+        if size > max_bytes:
+            raise upload_too_large(max_bytes)
+        digest.update(chunk)
+
+    async def store() -> str:
+        await file.seek(0)
+        staged = await storage.begin_upload(filename)
+        try:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                await staged.write(chunk)
+            return await staged.commit()
+        except BaseException:
+            await staged.abort()
+            raise
+
+    return HashedUpload(size_bytes=size, content_hash=digest.hexdigest(), store=store)
+
+
+def hash_bytes(storage: StorageBackend, filename: str, data: bytes) -> HashedUpload:
+    """Prepare an in-memory file (e.g. a Calibre import) the same way."""
+
+    async def store() -> str:
+        staged = await storage.begin_upload(filename)
+        try:
+            await staged.write(data)
+            return await staged.commit()
+        except BaseException:
+            await staged.abort()
+            raise
+
+    return HashedUpload(
+        size_bytes=len(data),
+        content_hash=hashlib.sha256(data).hexdigest(),
+        store=store,
+    )